@@ -1,3 +1,4 @@
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -29,12 +30,14 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "main.profiling.SQLProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "main.replicas.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
@@ -60,13 +63,44 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "dj_pro.wsgi.application"
 
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # Rendered content lists and their version stamps; use a shared backend (file, Redis, memcached) when running
+    # several worker processes so that invalidation reaches all of them. main.caching does not cache lists in a
+    # process-local backend like this one unless RESPONSE_CACHE_SINGLE_PROCESS is set.
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+        # Keep connections (and their page cache and mmap) across requests instead of reopening per request.
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+    },
 }
 
+# Aliases safe-method requests read from (main.replicas); empty sends everything to "default".
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = []
+# An SQLite read replica of "default", e.g. DATABASE_REPLICA_NAME=db.replica.sqlite3; locally,
+# `manage.py replica_sync` keeps it a copy of db.sqlite3 that lags by a configurable number of seconds.
+if os.environ.get("DATABASE_REPLICA_NAME"):
+    DATABASES["replica"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": os.environ["DATABASE_REPLICA_NAME"]}
+    DATABASE_REPLICAS = ["replica"]
+    DATABASE_ROUTERS = ["main.replicas.PrimaryReplicaRouter"]
+# After writing, a user reads from the primary for this long so that they see their own changes.
+REPLICA_STICKY_SECONDS = 5
+# Shared between worker processes in production, like RESPONSE_CACHE_ALIAS.
+REPLICA_PIN_CACHE_ALIAS = "default"
+# Lists changed less than this many seconds ago are not cached when read from a replica.
+REPLICA_MAX_LAG = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -98,6 +132,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
 REST_AUTH_REGISTER_SERIALIZERS = {
     "REGISTER_SERIALIZER": "main.serializers.CustomRegisterSerializer",
 }
@@ -126,3 +163,79 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
     "http://127.0.0.1:5500",
 ]
 FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+
+TRANSLATION_BACKEND = "main.translation.GoogleTranslateBackend"
+TRANSLATION_BATCH_SIZE = 20
+TRANSLATION_WORKERS = 4
+TRANSLATION_MAX_ATTEMPTS = 5
+TRANSLATION_CACHE_SIZE = 10000
+
+FEED_FANOUT_LIMIT = 1000
+FEED_MAX_ENTRIES = 800
+FEED_WRITE_BATCH_SIZE = 500
+FEED_PULL_WINDOW = timedelta(days=7)
+
+MEDIA_PROBE_MAX_BYTES = 4 * 1024 * 1024
+MEDIA_PROBE_TIMEOUT = 0.5
+MEDIA_JOB_BATCH_SIZE = 10
+MEDIA_JOB_MAX_ATTEMPTS = 3
+# Background jobs: seconds before a failed job is retried (doubling per attempt) and before a crashed claim is
+# taken over.
+JOB_RETRY_DELAY = 30
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_CLAIM_TIMEOUT = 10 * 60
+
+RENDITION_SIZES = [64, 256, 1080]
+RENDITION_FORMATS = ["webp", "jpeg"]
+RENDITION_QUALITY = 80
+
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+
+STORY_TTL = timedelta(hours=24)
+STORY_PURGE_BATCH_SIZE = 200
+
+RESPONSE_CACHE_ALIAS = "responses"
+RESPONSE_CACHE_TIMEOUT = 60
+# The app runs as a single process (runserver, tests), so a LocMem response cache is safe.
+RESPONSE_CACHE_SINGLE_PROCESS = DEBUG
+
+SEARCH_REBUILD_CHUNK_SIZE = 1000
+SEARCH_MAX_TERMS = 8
+SEARCH_MAX_OFFSET = 1000
+
+LIKE_BATCH_MAX_ITEMS = 200
+
+COMMENT_PREVIEW_SIZE = 3
+
+USERS_STREAM_CHUNK_SIZE = 2000
+STREAM_BLOCK_SIZE = 64 * 1024
+STREAM_SPOOL_SIZE = 1024 * 1024
+
+# Applied to every new SQLite connection (main.sqlite.configure_connection). WAL lets readers run alongside the
+# writer, synchronous=NORMAL fsyncs at checkpoints instead of every commit, busy_timeout (ms) waits for the write
+# lock instead of failing, cache_size is in KiB when negative.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+# main.sqlite.serialized_write: queue writers of one process on a lock and retry transactions that hit a lock.
+SQLITE_SERIALIZE_WRITES = True
+SQLITE_WRITE_RETRIES = 5
+SQLITE_WRITE_RETRY_DELAY = 0.02
+
+# Per-request SQL profiling (main.profiling.SQLProfilingMiddleware); off unless enabled.
+SQL_PROFILING = False
+SQL_PROFILING_N_PLUS_ONE_THRESHOLD = 10
+SQL_PROFILING_TOP_SHAPES = 5
+SQL_PROFILING_SLOW_REQUESTS = 50
+
+# None streams media from Django; "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd) hands it to the proxy.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_STREAM_BLOCK_SIZE = 64 * 1024
+MEDIA_CACHE_MAX_AGE = 86400
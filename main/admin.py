@@ -1,4 +1,4 @@
 from django.contrib import admin
 from .models import *
 
-admin.site.register([Comment, Like, News, Posts, Stories, UserProfile])
+admin.site.register([Comment, Like, News, Posts, Stories, UserProfile, TranslationJob, MediaJob, RenditionJob, UploadSession])
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 from django.db.models.signals import post_migrate
 
 
@@ -8,6 +9,8 @@ class MainConfig(AppConfig):
 
     def ready(self):
         post_migrate.connect(create_or_update_site, sender=self)
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection)
 
 
 def create_or_update_site(sender, **kwargs):
@@ -0,0 +1,108 @@
+import functools
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .likes import like_queryset, like_status
+from .models import Like, Subscription, UserProfile
+from .replicas import primary
+
+
+def json_response(data, status_code=200):
+    return JsonResponse(data, status=status_code, json_dumps_params={'ensure_ascii': False})
+
+
+def async_api_view(methods):
+    """Async counterpart of DRF's ``@api_view`` for small hot endpoints.
+
+    Like APIView, the view is CSRF-exempt (session authentication checks CSRF itself) and DRF exceptions are
+    answered as ``{"detail": ...}`` with their status code.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                return json_response(await view(request, *args, **kwargs))
+            except exceptions.APIException as error:
+                response = json_response({'detail': error.detail}, status_code=error.status_code)
+                if getattr(error, 'auth_header', None):
+                    response.headers['WWW-Authenticate'] = error.auth_header
+                return response
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+async def authenticated_user(request):
+    """The user DRF's default authenticators find for ``request``.
+
+    Failures are answered as APIView would: 401 with a challenge if the first authenticator has one, 403 otherwise.
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = await sync_to_async(lambda: Request(request, authenticators=authenticators).user)()
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+    except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as error:
+        challenge = authenticators[0].authenticate_header(request) if authenticators else None
+        if challenge:
+            error.auth_header = challenge
+        else:
+            error.status_code = status.HTTP_403_FORBIDDEN
+        raise
+    return user
+
+
+async def aget_or_404(queryset, **filters):
+    try:
+        return await queryset.aget(**filters)
+    except queryset.model.DoesNotExist:
+        raise exceptions.NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+@async_api_view(['GET', 'POST'])
+@primary
+async def like_action(request, lang, model_type, pk, verb, model_pk=None):
+    """Async like/unlike of news, posts, stories and comments, answering exactly like LikeActionsMixin.
+
+    The lookups and answers are shared with LikeActionsMixin (main.likes); the write itself is LikeManager.add/remove.
+    Django runs async ORM queries one at a time on the request's sync thread, so the profile and object lookups are
+    awaited in turn: the gain is that waiting requests no longer hold a thread each.
+    """
+    queryset = like_queryset(lang, model_type, model_pk)
+    if request.method == 'GET':
+        obj = await aget_or_404(queryset, pk=pk)
+        return {'likes_count': obj.likes_count}
+    user = await authenticated_user(request)
+    owner = await UserProfile.objects.aget(user_id=user.pk)
+    obj = await aget_or_404(queryset, pk=pk)
+    changed = await (Like.objects.aadd if verb == 'like' else Like.objects.aremove)(owner, obj)
+    return like_status(model_type, verb, changed, model_pk)
+
+
+@async_api_view(['GET', 'POST'])
+@primary
+async def subscription_action(request, pk, verb):
+    """Async subscribe/unsubscribe, answering like the UserViewSet actions of the same name."""
+    if request.method == 'GET':
+        if not await UserProfile.objects.filter(pk=pk).aexists():
+            raise exceptions.NotFound('No UserProfile matches the given query.')
+        return {'subscribers_count': await Subscription.objects.filter(subscribed_to_id=pk).acount()}
+    user = await authenticated_user(request)
+    profile = await aget_or_404(UserProfile.objects.select_related('user'), pk=pk)
+    subscriber = await UserProfile.objects.aget(user_id=user.pk)
+    username = profile.user.username
+    if verb == 'subscribe':
+        if subscriber.pk == profile.pk:
+            return {"message": "Ты не можешь подписаться на себя."}
+        if await subscriber.asubscribe(profile):
+            return {"message": f"Ты подписался на {username}"}
+        return {"message": f"Ты уже подписался на {username}"}
+    if subscriber.pk == profile.pk:
+        return {"message": "Ты не можешь отписаться от себя."}
+    if await subscriber.aunsubscribe(profile):
+        return {"message": f"Ты отписался от {username}"}
+    return {"message": f"Ты не подписан на {username}"}
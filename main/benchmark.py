@@ -0,0 +1,333 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from .caching import bump_versions, response_cache
+from .media import MEDIA_READY
+from .sqlite import is_lock_error, serialized_write
+from .translation import TRANSLATION_DONE, TRANSLATION_LANGUAGES, FakeTranslateBackend
+
+SEED_PREFIX = 'bench_'
+BENCHMARK_COMMENT = 'benchmark comment'
+# What Django does without main.sqlite tuning: rollback journal, fsync on every commit, no write queue or retries.
+BASELINE_SQLITE_SETTINGS = {'SQLITE_PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+                            'SQLITE_SERIALIZE_WRITES': False, 'SQLITE_WRITE_RETRIES': 0}
+WORDS = ['city', 'river', 'night', 'music', 'coffee', 'mountain', 'summer', 'friends', 'street', 'market', 'rain',
+         'garden', 'sunset', 'travel', 'book', 'bridge', 'football', 'school', 'winter', 'festival']
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def popularity_weights(size, skew):
+    """Zipf-like weights: the item of rank r is picked proportionally to 1 / r ** skew."""
+    return [1 / (rank + 1) ** skew for rank in range(size)]
+
+
+def skewed_sample(rng, population, weights, size, exclude=None):
+    """Up to ``size`` distinct items drawn by weight, never ``exclude``."""
+    size = min(size, len(population) - (exclude is not None))
+    chosen = {}
+    for _ in range(20):
+        if len(chosen) >= size:
+            break
+        for item in rng.choices(population, weights, k=size - len(chosen)):
+            if item is not exclude:
+                chosen[id(item)] = item
+    return list(chosen.values())[:size]
+
+
+def translate_rows(objects):
+    """Fill the per-language columns with FakeTranslateBackend output, as the translation worker would."""
+    backend = FakeTranslateBackend()
+    for lang in TRANSLATION_LANGUAGES:
+        texts = [getattr(obj, field) for obj in objects for field in obj.translatable_fields]
+        translated = iter(backend.translate(texts, lang))
+        for obj in objects:
+            for field in obj.translatable_fields:
+                setattr(obj, f'{field}_{lang}', next(translated))
+    for obj in objects:
+        obj.translation_status = TRANSLATION_DONE
+
+
+def spread_times(rng, objects, window, now):
+    """Scatter ``create_time`` over the last ``window`` (bulk_create stamps every row with the same time)."""
+    for obj in objects:
+        obj.create_time = now - timedelta(seconds=rng.uniform(0, window.total_seconds()))
+    if objects:
+        type(objects[0]).objects.bulk_update(objects, ['create_time'], batch_size=500)
+
+
+def remove_seeded_graph():
+    from .models import UserProfile
+    UserProfile.objects.filter(user__username__startswith=SEED_PREFIX).delete()
+    # Seeded accounts own nothing outside main, so they go with one DELETE statement: a queryset delete would probe
+    # the tables of every app with a relation to User, including ones that are imported but not installed
+    # (allauth.socialaccount). A row another app did add would fail the foreign key check instead of being orphaned.
+    accounts, params = User.objects.filter(username__startswith=SEED_PREFIX).values('id').query.sql_with_params()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {User._meta.db_table} WHERE id IN ({accounts})', params)
+
+
+def seed_social_graph(users=200, follows=20, news=20, posts=3, stories=1, comments=4, likes=20, skew=1.1, seed=0):
+    """Replace the seeded graph with a reproducible synthetic one and return the number of rows of each kind.
+
+    Popularity is Zipf-like (``skew``): a few accounts get most followers, and content by popular authors gets most
+    comments and likes. ``follows``, ``posts``, ``stories``, ``comments`` and ``likes`` are per-user averages.
+    Rows are bulk-inserted, then timelines, counters and the search index are rebuilt from them.
+    """
+    from .models import Comment, Like, News, Posts, Stories, Subscription, UserProfile
+    from .search import rebuild_index
+    from .timeline import backfill_timeline
+    rng = random.Random(seed)
+    now = timezone.now()
+    remove_seeded_graph()
+    with transaction.atomic():
+        password = make_password(None)
+        accounts = User.objects.bulk_create([
+            User(username=f'{SEED_PREFIX}{i}', email=f'{SEED_PREFIX}{i}@example.com', password=password)
+            for i in range(users)])
+        profiles = UserProfile.objects.bulk_create([UserProfile(user=account) for account in accounts])
+        weights = popularity_weights(len(profiles), skew)
+
+        subscriptions = []
+        for profile in profiles:
+            count = max(1, round(rng.expovariate(1 / follows))) if follows else 0
+            subscriptions += [Subscription(subscriber=profile, subscribed_to=author)
+                              for author in skewed_sample(rng, profiles, weights, count, exclude=profile)]
+        Subscription.objects.bulk_create(subscriptions, batch_size=500)
+
+        media = {'src': 'src/benchmark.jpg', 'type': 'Фото', 'media_status': MEDIA_READY}
+        news_rows = [News(title=sentence(rng, 4), body=sentence(rng, 30), **media) for _ in range(news)]
+        post_rows, story_rows, owner_weights = [], [], []
+        for profile, weight in zip(profiles, weights):
+            for _ in range(rng.randint(0, 2 * posts)):
+                post_rows.append(Posts(title=sentence(rng, 4), body=sentence(rng, 30), owner=profile, **media))
+                owner_weights.append(weight)
+            for _ in range(rng.randint(0, 2 * stories)):
+                story_rows.append(Stories(title=sentence(rng, 6), owner=profile, **media))
+                owner_weights.append(weight)
+        for rows in [news_rows, post_rows, story_rows]:
+            translate_rows(rows)
+            if rows:
+                type(rows[0]).objects.bulk_create(rows, batch_size=500)
+        spread_times(rng, news_rows, timedelta(days=7), now)
+        spread_times(rng, post_rows, timedelta(days=7), now)
+        spread_times(rng, story_rows, settings.STORY_TTL, now)
+
+        commentable = post_rows + story_rows
+        comment_rows = []
+        for target in rng.choices(commentable, owner_weights, k=users * comments) if commentable else []:
+            comment = Comment(body=sentence(rng, 8), owner=rng.choice(profiles))
+            comment.post, comment.story = (target, None) if isinstance(target, Posts) else (None, target)
+            comment_rows.append(comment)
+        translate_rows(comment_rows)
+        Comment.objects.bulk_create(comment_rows, batch_size=500)
+
+        # News is weighted like the most followed account, comments like the least followed one.
+        likeable = news_rows + commentable + comment_rows
+        like_weights = [weights[0]] * len(news_rows) + owner_weights + [weights[-1]] * len(comment_rows)
+        content_types = {model: ContentType.objects.get_for_model(model) for model in [News, Posts, Stories, Comment]}
+        liked = {}
+        for target in rng.choices(likeable, like_weights, k=users * likes) if likeable else []:
+            owner = rng.choice(profiles)
+            liked[(owner.pk, type(target), target.pk)] = Like(owner=owner, content_type=content_types[type(target)],
+                                                              object_id=target.pk)
+        Like.objects.bulk_create(liked.values(), batch_size=500)
+
+        like_counts = Counter((model, pk) for _, model, pk in liked)
+        comment_counts = Counter((Posts, c.post_id) if c.post_id else (Stories, c.story_id) for c in comment_rows)
+        for rows in [news_rows, post_rows, story_rows, comment_rows]:
+            for obj in rows:
+                obj.likes_count = like_counts[(type(obj), obj.pk)]
+                if not isinstance(obj, (News, Comment)):
+                    obj.comments_count = comment_counts[(type(obj), obj.pk)]
+            if rows:
+                fields = ['likes_count'] if isinstance(rows[0], (News, Comment)) else ['likes_count', 'comments_count']
+                type(rows[0]).objects.bulk_update(rows, fields, batch_size=500)
+
+        for profile in profiles:
+            backfill_timeline(profile)
+    for _ in rebuild_index():
+        pass
+    bump_versions('news', 'posts', 'stories', 'userprofile')
+    return {'users': len(profiles), 'subscriptions': len(subscriptions), 'news': len(news_rows),
+            'posts': len(post_rows), 'stories': len(story_rows), 'comments': len(comment_rows), 'likes': len(liked)}
+
+
+def default_endpoints():
+    """Reads and writes worth tracking, aimed at the busiest rows of the seeded graph.
+
+    Returns ``(viewer, endpoints)``: the seeded user the requests are made as (the one following the most
+    accounts) and a list of ``{name, method, path, data}``. Writes come in pairs that undo each other.
+    """
+    from .models import Posts, UserProfile
+    seeded = UserProfile.objects.filter(user__username__startswith=SEED_PREFIX)
+    viewer = seeded.annotate(total=Count('subscribes')).order_by('-total', 'id').first()
+    popular = seeded.annotate(total=Count('subscribers')).order_by('-total', 'id').first()
+    post = Posts.objects.filter(owner__in=seeded).order_by('-likes_count', 'id').first()
+    if viewer is None or post is None:
+        raise ValueError('Nothing to benchmark: run seed_social_graph first.')
+    word = post.title.split()[0].lower()
+    return viewer, [
+        {'name': 'news_list', 'method': 'get', 'path': '/en/news/'},
+        {'name': 'posts_list', 'method': 'get', 'path': '/en/posts/'},
+        {'name': 'stories_list', 'method': 'get', 'path': '/en/stories/'},
+        {'name': 'post_detail', 'method': 'get', 'path': f'/en/posts/{post.pk}/'},
+        {'name': 'post_comments', 'method': 'get', 'path': f'/en/posts/{post.pk}/comments/'},
+        {'name': 'users_list', 'method': 'get', 'path': '/users/'},
+        {'name': 'user_detail', 'method': 'get', 'path': f'/users/{popular.pk}/'},
+        {'name': 'user_posts', 'method': 'get', 'path': f'/users/{popular.pk}/posts/'},
+        {'name': 'feed', 'method': 'get', 'path': '/en/feed/'},
+        {'name': 'search', 'method': 'get', 'path': f'/en/search/?q={word}'},
+        {'name': 'like_state', 'method': 'post', 'path': '/en/likes/state/',
+         'data': {'items': [{'type': 'posts', 'id': post.pk}]}},
+        {'name': 'post_like', 'method': 'post', 'path': f'/en/posts/{post.pk}/like/'},
+        {'name': 'post_unlike', 'method': 'post', 'path': f'/en/posts/{post.pk}/unlike/'},
+        {'name': 'comment_create', 'method': 'post', 'path': f'/en/posts/{post.pk}/comments/',
+         'data': {'body': BENCHMARK_COMMENT}},
+    ]
+
+
+def run_benchmark(viewer, endpoints, repeat=5):
+    """Call every endpoint ``repeat`` times (after one unrecorded warm-up round) as ``viewer``.
+
+    The response cache is cleared before each call, so lists are measured on the path that reads the database.
+    Returns a report with the query count, median and fastest wall time and response size of each endpoint.
+    """
+    from rest_framework.test import APIClient
+    from .models import Comment
+    client = APIClient()
+    client.force_authenticate(viewer.user)
+    samples = {endpoint['name']: [] for endpoint in endpoints}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for round_number in range(repeat + 1):
+            for endpoint in endpoints:
+                response_cache().clear()
+                call = getattr(client, endpoint['method'])
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    response = call(endpoint['path'], endpoint.get('data'), format='json')
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    elapsed = time.perf_counter() - start
+                if round_number:
+                    samples[endpoint['name']].append((response.status_code, len(context), elapsed, len(body)))
+    Comment.objects.filter(owner=viewer, body=BENCHMARK_COMMENT).delete()
+    results = {}
+    for endpoint in endpoints:
+        runs = samples[endpoint['name']]
+        times = [elapsed * 1000 for _, _, elapsed, _ in runs]
+        results[endpoint['name']] = {
+            'method': endpoint['method'].upper(), 'path': endpoint['path'], 'status': runs[-1][0],
+            'queries': max(queries for _, queries, _, _ in runs), 'time_ms': round(statistics.median(times), 3),
+            'min_time_ms': round(min(times), 3), 'bytes': max(size for _, _, _, size in runs),
+        }
+    return {'created': timezone.now().isoformat(), 'database': connection.vendor, 'repeat': repeat,
+            'endpoints': results}
+
+
+def compare_reports(base, head, time_threshold=0.2, size_threshold=0.1, min_time_ms=1.0):
+    """Regressions of ``head`` against ``base``: more queries, a new status code, or time/size above the thresholds.
+
+    Time only counts when it grew by more than ``min_time_ms`` as well, so sub-millisecond noise is ignored.
+    """
+    regressions = []
+    for name, after in head['endpoints'].items():
+        before = base['endpoints'].get(name)
+        if before is None:
+            continue
+        if after['status'] != before['status']:
+            regressions.append({'endpoint': name, 'metric': 'status', 'base': before['status'],
+                                'head': after['status']})
+        if after['queries'] > before['queries']:
+            regressions.append({'endpoint': name, 'metric': 'queries', 'base': before['queries'],
+                                'head': after['queries']})
+        if (after['time_ms'] > before['time_ms'] * (1 + time_threshold)
+                and after['time_ms'] - before['time_ms'] > min_time_ms):
+            regressions.append({'endpoint': name, 'metric': 'time_ms', 'base': before['time_ms'],
+                                'head': after['time_ms']})
+        if after['bytes'] > before['bytes'] * (1 + size_threshold):
+            regressions.append({'endpoint': name, 'metric': 'bytes', 'base': before['bytes'], 'head': after['bytes']})
+    return regressions
+
+
+def write_worker(profile, posts, operations, barrier, samples):
+    """Like a post, comment on it and unlike it again, ``operations`` writes in all, on its own connection."""
+    from .models import Comment, Like
+    create_comment = serialized_write(Comment.objects.create)
+    barrier.wait()
+    try:
+        for index in range(operations):
+            post = posts[index // 3 % len(posts)]
+            start = time.perf_counter()
+            try:
+                if index % 3 == 0:
+                    Like.objects.add(profile, post)
+                elif index % 3 == 1:
+                    create_comment(body=BENCHMARK_COMMENT, owner=profile, post=post)
+                else:
+                    Like.objects.remove(profile, post)
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+                samples.append((time.perf_counter() - start, False))
+            else:
+                samples.append((time.perf_counter() - start, True))
+    finally:
+        connections.close_all()
+
+
+def run_write_benchmark(workers=8, operations=150, tuned=True):
+    """Concurrent like/comment/unlike throughput of ``workers`` seeded users hitting the same few popular posts.
+
+    ``tuned`` False runs with BASELINE_SQLITE_SETTINGS instead of the configured pragmas and write retries. Only
+    meaningful on a file database; the writes are undone afterwards.
+    """
+    from .models import Comment, Like, Posts, UserProfile
+    seeded = UserProfile.objects.filter(user__username__startswith=SEED_PREFIX)
+    profiles = list(seeded.order_by('id')[:workers])
+    posts = list(Posts.objects.filter(owner__in=seeded).order_by('-likes_count', 'id')[:5])
+    if len(profiles) < workers or not posts:
+        raise ValueError('Nothing to benchmark: run seed_social_graph first.')
+    content_type = ContentType.objects.get_for_model(Posts)
+    liked = set(Like.objects.filter(owner__in=profiles, content_type=content_type,
+                                    object_id__in=[post.pk for post in posts]).values_list('owner_id', 'object_id'))
+    samples = []
+    with override_settings(**({} if tuned else BASELINE_SQLITE_SETTINGS)):
+        connections.close_all()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        barrier = threading.Barrier(workers + 1)
+        threads = [threading.Thread(target=write_worker, args=(profile, posts, operations, barrier, samples))
+                   for profile in profiles]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        connections.close_all()
+    Comment.objects.filter(owner__in=profiles, body=BENCHMARK_COMMENT).delete()
+    for profile in profiles:
+        for post in posts:
+            if (profile.pk, post.pk) not in liked:
+                Like.objects.remove(profile, post)
+    times = sorted(elapsed_one * 1000 for elapsed_one, _ in samples)
+    written = sum(ok for _, ok in samples)
+    return {'mode': 'tuned' if tuned else 'baseline', 'journal_mode': journal_mode, 'workers': workers,
+            'writes': written, 'lock_errors': len(samples) - written, 'seconds': round(elapsed, 3),
+            'writes_per_second': round(written / elapsed, 1), 'p50_ms': round(statistics.median(times), 3),
+            'p95_ms': round(times[int(len(times) * 0.95) - 1], 3)}
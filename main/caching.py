@@ -0,0 +1,107 @@
+import hashlib
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+from .replicas import reading_from_replica
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def response_cache_enabled():
+    """Stamps in a process-local cache never reach the other workers, which would keep serving (and answering 304
+    for) lists that were invalidated elsewhere; such a cache is only used when RESPONSE_CACHE_SINGLE_PROCESS is set.
+    """
+    return settings.RESPONSE_CACHE_SINGLE_PROCESS or not isinstance(response_cache(), LocMemCache)
+
+
+def stamp_key(label):
+    return f'stamp:{label}'
+
+
+def set_stamps(labels):
+    now = time.time()
+    response_cache().set_many({stamp_key(label): now for label in labels}, timeout=None)
+
+
+def get_stamps(labels):
+    """Return the version stamp (time of the last change) of each label, starting missing ones at now."""
+    cache = response_cache()
+    keys = [stamp_key(label) for label in labels]
+    stamps = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        stamps.update(missing)
+    return [stamps[key] for key in keys]
+
+
+def bump_versions(*labels):
+    """Mark every cached list built from ``labels`` as stale.
+
+    The stamps move right away and again once the surrounding transaction commits, so a list rendered from
+    pre-commit rows in between is never served under the final stamp.
+    """
+    labels = sorted(set(labels))
+    if labels:
+        set_stamps(labels)
+        transaction.on_commit(lambda: set_stamps(labels))
+
+
+def cache_labels(obj):
+    """Stamps that change when ``obj`` changes: comments belong to the list of their post or story."""
+    if getattr(obj, 'post_id', None):
+        return ['posts']
+    if getattr(obj, 'story_id', None):
+        return ['stories']
+    return [obj._meta.model_name]
+
+
+def invalidate(*objects):
+    bump_versions(*[label for obj in objects for label in cache_labels(obj)])
+
+
+def cached_response(request, labels, build, expires=None):
+    """Serve ``build()`` from the response cache, keyed by (endpoint, lang, query params, cursor) and the stamps.
+
+    The ETag comes from the same stamps, so a client revalidating an unchanged list gets a 304 without the data ever
+    being read. There is no Last-Modified: whole seconds cannot tell apart two changes made within the same second.
+    ``expires`` is the next time the list changes without a write (a story expiring): it is part of the key and the
+    ETag, and the cached entry never outlives it. Lists read from a replica within REPLICA_MAX_LAG of a change are
+    not cached.
+    """
+    if not response_cache_enabled():
+        return build()
+    stamps = get_stamps(labels)
+    if reading_from_replica() and time.time() - max(stamps) < settings.REPLICA_MAX_LAG:
+        # A replica may not have caught up with the last change yet: answer from it, but neither store the list nor
+        # give the client validators that would pin it under the current stamps.
+        return build()
+    params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+    raw = repr((request.get_host(), request.path, params, stamps, expires and expires.timestamp()))
+    digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    etag = f'"{digest[:32]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        cache = response_cache()
+        data = cache.get(f'response:{digest}')
+        if data is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            if expires is not None:
+                timeout = max(0, min(timeout, math.ceil(expires.timestamp() - time.time())))
+            if timeout:
+                cache.set(f'response:{digest}', response.data, timeout)
+        else:
+            response = Response(data)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,75 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_STATUS_CHOICES = [
+    (JOB_PENDING, 'Pending'),
+    (JOB_RUNNING, 'Running'),
+    (JOB_DONE, 'Done'),
+    (JOB_FAILED, 'Failed'),
+]
+
+
+def enqueue_job(model, instance, defaults=None, **lookup):
+    content_type = ContentType.objects.get_for_model(instance)
+    return model.objects.get_or_create(content_type=content_type, object_id=instance.pk, status=JOB_PENDING,
+                                       defaults=defaults, **lookup)
+
+
+def claim_jobs(model, limit):
+    """Mark up to ``limit`` due jobs of ``model`` as running and return them.
+
+    A job is due when it is pending and its backoff has passed, or when it is running past its lease (the worker that
+    claimed it died). Claiming leases a job for JOB_CLAIM_TIMEOUT. Every claim stamps its rows with a token of its
+    own and returns only those, so workers claiming at the same time never get the same job.
+    """
+    using = router.db_for_write(model)
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    due = Q(status__in=[JOB_PENDING, JOB_RUNNING], next_attempt_at__lte=now)
+    with transaction.atomic(using=using):
+        pending = model.objects.using(using).filter(due).order_by('next_attempt_at', 'id')
+        if connections[using].features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        ids = list(pending.values_list('id', flat=True)[:limit])
+        model.objects.using(using).filter(due, id__in=ids).update(
+            status=JOB_RUNNING, claim=token, attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.JOB_CLAIM_TIMEOUT))
+    return list(model.objects.using(using).filter(id__in=ids, claim=token).select_related('content_type'))
+
+
+def retry_delay(attempts):
+    """JOB_RETRY_DELAY, doubled for every attempt already made, up to JOB_RETRY_MAX_DELAY."""
+    return timedelta(seconds=min(settings.JOB_RETRY_DELAY * 2 ** max(attempts - 1, 0), settings.JOB_RETRY_MAX_DELAY))
+
+
+def fail_jobs(jobs, error, max_attempts=None):
+    """Queue failed jobs again after an exponential backoff, or mark them failed once they are out of attempts.
+
+    Jobs whose lease another worker has since taken over are left alone. Returns the jobs that failed for good.
+    """
+    now = timezone.now()
+    failed = []
+    for job in jobs:
+        if max_attempts and job.attempts < max_attempts:
+            values = {'status': JOB_PENDING, 'next_attempt_at': now + retry_delay(job.attempts)}
+        else:
+            values = {'status': JOB_FAILED}
+            failed.append(job)
+        job.__class__.objects.filter(id=job.id, claim=job.claim).update(error=str(error), **values)
+    return failed
+
+
+def finish_job(job, error=None, max_attempts=None):
+    if error is None:
+        job.__class__.objects.filter(id=job.id, claim=job.claim).update(status=JOB_DONE, error='')
+        return JOB_DONE
+    return JOB_FAILED if fail_jobs([job], error, max_attempts) else JOB_PENDING
@@ -0,0 +1,27 @@
+from rest_framework import exceptions
+from .models import Comment, News, Posts, Stories
+from .translation import TRANSLATION_LANGUAGES
+
+LIKE_LABELS = {'news': 'News', 'posts': 'Post', 'stories': 'Story', 'comments': 'Comment'}
+
+
+def like_queryset(lang, model_type, model_pk=None):
+    """The rows a like or unlike of ``model_type`` (a comment under ``model_pk``) looks its object up in."""
+    if lang not in TRANSLATION_LANGUAGES:
+        raise exceptions.NotFound()
+    if model_pk is not None:
+        parent = 'story_id' if model_type == 'stories' else 'post_id'
+        return Comment.objects.filter(**{parent: model_pk}).only('id', 'likes_count', 'post_id', 'story_id')
+    if model_type == 'stories':
+        return Stories.objects.active().filter(**{f'title_{lang}__isnull': False}).only('id', 'likes_count')
+    model = News if model_type == 'news' else Posts
+    return model.objects.filter(**{f'title_{lang}__isnull': False, f'body_{lang}__isnull': False}).only(
+        'id', 'likes_count')
+
+
+def like_status(model_type, verb, changed, model_pk=None):
+    """The answer to a like or unlike; ``changed`` is what LikeManager.add/remove returned."""
+    label = LIKE_LABELS['comments' if model_pk is not None else model_type]
+    if verb == 'like':
+        return {'status': f'{label} liked.' if changed else f'You already liked this {label.lower()}.'}
+    return {'status': f'{label} unliked.' if changed else f'You have not liked this {label.lower()} yet.'}
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Prefetch, Q
+from .models import Comment, Like
+from .translation import unused_translation_fields
+
+
+class LikeLoader:
+    """Loads the likes of many objects (of any likeable model) in one query, grouped by (content_type, object_id)."""
+
+    def __init__(self):
+        self.likes = {}
+
+    def key(self, obj):
+        return ContentType.objects.get_for_model(obj).id, obj.pk
+
+    def load(self, objects):
+        missing = {}
+        for obj in objects:
+            content_type_id, pk = self.key(obj)
+            if (content_type_id, pk) not in self.likes:
+                missing.setdefault(content_type_id, set()).add(pk)
+        if not missing:
+            return
+        query = Q()
+        for content_type_id, ids in missing.items():
+            query |= Q(content_type_id=content_type_id, object_id__in=ids)
+            for pk in ids:
+                self.likes[(content_type_id, pk)] = []
+        for like in Like.objects.filter(query).select_related('owner__user').order_by('id'):
+            self.likes[(like.content_type_id, like.object_id)].append(like)
+
+    def get(self, obj):
+        key = self.key(obj)
+        if key not in self.likes:
+            self.load([obj])
+        return self.likes[key]
+
+
+def get_like_loader(context):
+    return context.setdefault('like_loader', LikeLoader())
+
+
+def collect_likeable(serializer, items):
+    """Return ``items`` plus every nested object the serializer will render likes for (e.g. prefetched comments)."""
+    collected = list(items)
+    for field in serializer.fields.values():
+        child = getattr(field, 'child', None)
+        if child is None or 'likes' not in getattr(child, 'fields', {}):
+            continue
+        for item in items:
+            related = getattr(item, field.source, None)
+            if related is None:
+                continue
+            related = list(related.all() if hasattr(related, 'all') else related)
+            collected += collect_likeable(child, related)
+    return collected
+
+
+def comments_prefetch(lang=None):
+    """Prefetch the newest COMMENT_PREVIEW_SIZE comments of every row as ``latest_comments``.
+
+    The sliced prefetch runs as a single ROW_NUMBER() window query for the whole page.
+    """
+    queryset = Comment.objects.select_related('owner__user').order_by('-create_time', '-id')
+    if lang:
+        queryset = queryset.defer(*unused_translation_fields(Comment, lang))
+    return Prefetch('comments', queryset=queryset[:settings.COMMENT_PREVIEW_SIZE], to_attr='latest_comments')
@@ -0,0 +1,109 @@
+import asyncio
+import statistics
+import threading
+import time
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+
+class SyncActionsURLConf:
+    """The app's URLs without the async views, so the DRF viewset actions answer the same paths."""
+
+    @property
+    def urlpatterns(self):
+        from . import urls
+        return [pattern for pattern in urls.urlpatterns if pattern not in urls.async_urlpatterns]
+
+
+sync_actions_urlconf = SyncActionsURLConf()
+
+
+def session_headers(user):
+    """ASGI headers of a logged-in browser session for ``user``, with a CSRF cookie and matching header."""
+    client = Client()
+    client.force_login(user)
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    csrf = get_random_string(32)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={session}; {settings.CSRF_COOKIE_NAME}={csrf}'
+    return [(b'host', b'testserver'), (b'cookie', cookie.encode()), (b'x-csrftoken', csrf.encode())]
+
+
+async def asgi_request(app, method, path, headers):
+    """Send one bodiless HTTP request straight to the ASGI ``app`` and return the response status."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '', 'headers': headers,
+             'client': ('127.0.0.1', 0), 'server': ('testserver', 80)}
+    sent = False
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status[0]
+
+
+def action_cycle(post_id, profile_id):
+    return [('POST', f'/en/posts/{post_id}/like/'), ('GET', f'/en/posts/{post_id}/like/'),
+            ('POST', f'/en/posts/{post_id}/unlike/'), ('POST', f'/users/{profile_id}/subscribe/'),
+            ('POST', f'/users/{profile_id}/unsubscribe/')]
+
+
+async def drive(app, workers, total):
+    latencies, errors = [], 0
+    peak_threads = threading.active_count()
+    remaining = total
+
+    async def worker(headers, cycle):
+        nonlocal errors, peak_threads, remaining
+        step = 0
+        while remaining > 0:
+            remaining -= 1
+            method, path = cycle[step % len(cycle)]
+            step += 1
+            start = time.perf_counter()
+            status = await asgi_request(app, method, path, headers)
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+            peak_threads = max(peak_threads, threading.active_count())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(headers, cycle) for headers, cycle in workers))
+    return time.perf_counter() - start, latencies, errors, peak_threads
+
+
+def run_load_test(workers, total, mode):
+    """Run ``total`` like/unlike/subscribe/unsubscribe requests through the ASGI app, ``len(workers)`` at a time.
+
+    ``workers`` are ``(user, post id, profile id)``; each replays its cycle of actions as its own user. ``mode``
+    'async' serves the actions from main.async_views, 'sync' from the DRF viewsets. Returns throughput, latency
+    percentiles, error responses and the peak number of live threads.
+    """
+    prepared = [(session_headers(user), action_cycle(post_id, profile_id)) for user, post_id, profile_id in workers]
+    overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+    if mode == 'sync':
+        overrides['ROOT_URLCONF'] = sync_actions_urlconf
+    with override_settings(**overrides):
+        elapsed, latencies, errors, peak_threads = asyncio.run(drive(get_asgi_application(), prepared, total))
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {'mode': mode, 'concurrency': len(workers), 'requests': len(latencies), 'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 3), 'errors': errors,
+            'peak_threads': peak_threads}
@@ -0,0 +1,27 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from main.benchmark import default_endpoints, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure query count, wall time and response size of the main endpoints against the seeded graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Recorded calls per endpoint.")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Only this endpoint (repeatable).")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            viewer, endpoints = default_endpoints()
+        except ValueError as error:
+            raise CommandError(error)
+        if options['endpoints']:
+            endpoints = [endpoint for endpoint in endpoints if endpoint['name'] in options['endpoints']]
+        report = json.dumps(run_benchmark(viewer, endpoints, repeat=options['repeat']), indent=2)
+        if not options['output']:
+            self.stdout.write(report)
+            return
+        with open(options['output'], 'w') as file:
+            file.write(report + '\n')
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(endpoints)} endpoint results to {options['output']}."))
@@ -0,0 +1,27 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from main.benchmark import compare_reports
+
+
+class Command(BaseCommand):
+    help = "Compare two benchmark reports and fail if the second one regressed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('base')
+        parser.add_argument('head')
+        parser.add_argument('--time-threshold', type=float, default=0.2, help="Allowed relative slowdown.")
+        parser.add_argument('--size-threshold', type=float, default=0.1, help="Allowed relative response growth.")
+        parser.add_argument('--min-time-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this.")
+
+    def handle(self, *args, **options):
+        reports = []
+        for path in [options['base'], options['head']]:
+            with open(path) as file:
+                reports.append(json.load(file))
+        regressions = compare_reports(*reports, time_threshold=options['time_threshold'],
+                                      size_threshold=options['size_threshold'], min_time_ms=options['min_time_ms'])
+        for item in regressions:
+            self.stdout.write(f"{item['endpoint']}: {item['metric']} {item['base']} -> {item['head']}")
+        if regressions:
+            raise CommandError(f"{len(regressions)} regressions.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
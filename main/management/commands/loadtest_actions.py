@@ -0,0 +1,30 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from main.benchmark import SEED_PREFIX
+from main.loadtest import run_load_test
+from main.models import Posts, UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Load-test like/unlike and subscribe/unsubscribe through the ASGI app, served by the async views and by "
+            "the sync viewset actions, using the users from seed_social_graph.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per mode.")
+        parser.add_argument('--mode', choices=['async', 'sync', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        profiles = list(UserProfile.objects.filter(user__username__startswith=SEED_PREFIX).select_related(
+            'user').annotate(total=Count('subscribers')).order_by('-total', 'id')[:concurrency + 1])
+        posts = list(Posts.objects.order_by('-likes_count', 'id').values_list('id', flat=True)[:concurrency])
+        if len(profiles) < 2 or not posts:
+            raise CommandError("Nothing to load-test: run seed_social_graph first.")
+        # Everyone likes one of the hottest posts and follows the most followed account that is not themselves.
+        workers = [(profile.user, posts[i % len(posts)], profiles[1 if profile is profiles[0] else 0].pk)
+                   for i, profile in enumerate(profiles[:concurrency])]
+        modes = ['sync', 'async'] if options['mode'] == 'both' else [options['mode']]
+        for mode in modes:
+            self.stdout.write(json.dumps(run_load_test(workers, options['requests'], mode)))
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from main.media import process_media_jobs
+from main.renditions import process_rendition_jobs
+
+
+class Command(BaseCommand):
+    help = "Decode uploaded media in the background: duration, dimensions, video poster frames and image renditions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Jobs claimed per round.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = process_media_jobs(limit=options['batch_size'])
+            handled += process_rendition_jobs(limit=options['batch_size'])
+            total += handled
+            if handled:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} media jobs."))
@@ -0,0 +1,37 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from main.models import Comment, Like, News, Posts, Stories
+
+
+class Command(BaseCommand):
+    help = ("Recompute likes_count on Posts, News, Stories and Comment, and comments_count on Posts and Stories, "
+            "where they drifted from the Like and Comment tables.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows written per bulk update.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted rows.")
+
+    def handle(self, *args, **options):
+        for model in [Posts, News, Stories, Comment]:
+            content_type = ContentType.objects.get_for_model(model)
+            counts = Like.objects.filter(content_type=content_type, object_id=OuterRef('pk')).order_by().values(
+                'object_id').annotate(total=Count('id')).values('total')
+            self.reconcile(model, 'likes_count', counts, options)
+        for model, field in [(Posts, 'post'), (Stories, 'story')]:
+            counts = Comment.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+                total=Count('id')).values('total')
+            self.reconcile(model, 'comments_count', counts, options)
+
+    def reconcile(self, model, counter, counts, options):
+        drifted = list(model.objects.annotate(
+            actual=Coalesce(Subquery(counts, output_field=IntegerField()), 0)).exclude(
+            **{counter: F('actual')}).values_list('id', 'actual'))
+        if not options['dry_run']:
+            size = options['batch_size']
+            for start in range(0, len(drifted), size):
+                batch = [model(id=pk, **{counter: actual}) for pk, actual in drifted[start:start + size]]
+                model.objects.bulk_update(batch, [counter])
+        verb = "would be fixed" if options['dry_run'] else "fixed"
+        self.stdout.write(f"{model._meta.verbose_name_plural}: {len(drifted)} drifted {counter} {verb}.")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from main.media import PHOTO_TYPES, VIDEO_TYPES
+from main.models import News, Posts, Stories, UserProfile
+from main.renditions import backfill_renditions
+
+
+class Command(BaseCommand):
+    help = "Render missing avatar, banner and photo/poster renditions for existing media on a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--batch-size', type=int, default=200, help="Images submitted to the pool at once.")
+        parser.add_argument('--force', action='store_true', help="Re-render images that already have renditions.")
+
+    def sources(self, force):
+        for field in ['avatar', 'banner']:
+            profiles = UserProfile.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            yield profiles if force else profiles.filter(**{f'{field}_renditions': {}}), field
+        for model in [Posts, News, Stories]:
+            content = model.objects.all() if force else model.objects.filter(src_renditions={})
+            yield content.filter(type__in=PHOTO_TYPES), 'src'
+            yield content.filter(type__in=VIDEO_TYPES).exclude(poster='').exclude(poster__isnull=True), 'poster'
+
+    def items(self, force, chunk_size):
+        # Snapshot the ids first: rows are updated while we go, which must not disturb an open cursor.
+        for queryset, field in self.sources(force):
+            ids = list(queryset.values_list('pk', flat=True))
+            for start in range(0, len(ids), chunk_size):
+                for obj in queryset.model.objects.in_bulk(ids[start:start + chunk_size]).values():
+                    yield obj, field
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        batch = []
+        for item in self.items(options['force'], options['batch_size']):
+            batch.append(item)
+            if len(batch) >= options['batch_size']:
+                result = backfill_renditions(batch, options['workers'])
+                done, failed, batch = done + result[0], failed + result[1], []
+        if batch:
+            result = backfill_renditions(batch, options['workers'])
+            done, failed = done + result[0], failed + result[1]
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} images, {failed} failed."))
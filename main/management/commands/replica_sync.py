@@ -0,0 +1,26 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from main.replicas import sync_replicas
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into the DATABASE_REPLICAS every --lag seconds to simulate replication lag."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=2.0, help="Seconds between copies.")
+        parser.add_argument('--once', action='store_true', help="Copy once and exit.")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("DATABASE_REPLICAS is empty.")
+        while True:
+            try:
+                sync_replicas()
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(f"Synced {', '.join(settings.DATABASE_REPLICAS)}.")
+            if options['once']:
+                break
+            time.sleep(options['lag'])
+        self.stdout.write(self.style.SUCCESS("Replicas are up to date."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from main.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index, streaming each content table in primary-key chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        totals = {}
+        for model, indexed in rebuild_index(chunk_size=options['chunk_size']):
+            totals[model._meta.verbose_name_plural] = indexed
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {indexed}")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {sum(totals.values())} objects."))
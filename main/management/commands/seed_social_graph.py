@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from main.benchmark import SEED_PREFIX, seed_social_graph
+
+
+class Command(BaseCommand):
+    help = (f"Replace the '{SEED_PREFIX}*' users and everything they own with a reproducible synthetic social graph "
+            "for benchmarks.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--follows', type=int, default=20, help="Average accounts followed per user.")
+        parser.add_argument('--news', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=3, help="Average posts per user.")
+        parser.add_argument('--stories', type=int, default=1, help="Average active stories per user.")
+        parser.add_argument('--comments', type=int, default=4, help="Comments per user, skewed to popular content.")
+        parser.add_argument('--likes', type=int, default=20, help="Likes per user, skewed to popular content.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent of the popularity curve.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        counts = seed_social_graph(**{key: options[key] for key in [
+            'users', 'follows', 'news', 'posts', 'stories', 'comments', 'likes', 'skew', 'seed']})
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()) + "."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from main.stories import purge_expired_stories
+
+
+class Command(BaseCommand):
+    help = "Delete expired stories with their comments, likes and media files in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_stories(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired stories."))
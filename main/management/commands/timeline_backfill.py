@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from main.models import UserProfile
+from main.timeline import backfill_timeline
+
+
+class Command(BaseCommand):
+    help = "Fill home timelines with recent posts and stories from the accounts each user follows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="UserProfile id (repeatable).")
+        parser.add_argument('--limit', type=int, default=None, help="Newest posts and stories to copy per user.")
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.order_by('id')
+        if options['users']:
+            profiles = profiles.filter(id__in=options['users'])
+        total = 0
+        for profile in profiles.iterator(chunk_size=500):
+            total += backfill_timeline(profile, per_model=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote up to {total} timeline entries."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from main.timeline import trim_timelines
+
+
+class Command(BaseCommand):
+    help = "Delete home timeline entries beyond the newest FEED_MAX_ENTRIES of each user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-entries', type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted = trim_timelines(options['max_entries'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} timeline entries."))
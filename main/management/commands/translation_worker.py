@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from main.translation import process_translation_jobs, retry_failed_translations, translation_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Fill in title_*/body_* for rows waiting in the translation queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Jobs claimed per round.")
+        parser.add_argument('--workers', type=int, default=None, help="Concurrent requests to the translator.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the jobs that are due and exit; jobs waiting out a retry backoff stay queued.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Queue the rows whose translation failed for good again before starting.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f"Queued {retry_failed_translations()} failed translations again.")
+        total = 0
+        while True:
+            handled = process_translation_jobs(limit=options['batch_size'], workers=options['workers'])
+            total += handled
+            if handled:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        stats = translation_cache_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {total} translation jobs. Translation memory: {stats['memory_hits']} memory hits, "
+            f"{stats['db_hits']} db hits, {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})."))
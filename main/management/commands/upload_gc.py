@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from main.uploads import collect_abandoned_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions idle for longer than UPLOAD_SESSION_TTL together with their unattached files."
+
+    def handle(self, *args, **options):
+        removed = collect_abandoned_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} upload sessions."))
@@ -0,0 +1,167 @@
+import io
+import struct
+import time
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+MEDIA_PENDING = 'pending'
+MEDIA_READY = 'ready'
+MEDIA_FAILED = 'failed'
+MEDIA_STATUS_CHOICES = [
+    (MEDIA_PENDING, 'Pending'),
+    (MEDIA_READY, 'Ready'),
+    (MEDIA_FAILED, 'Failed'),
+]
+
+VIDEO_TYPES = ['Видео', 'Video']
+PHOTO_TYPES = ['Фото', 'Photo', 'Foto']
+
+MP4_VIDEO_CODECS = {b'avc1': 'h264', b'avc3': 'h264', b'hvc1': 'hevc', b'hev1': 'hevc', b'vp09': 'vp9',
+                    b'av01': 'av1', b'mp4v': 'mpeg4'}
+MATROSKA_VIDEO_CODECS = {b'V_MPEG4/ISO/AVC': 'h264', b'V_MPEGH/ISO/HEVC': 'hevc', b'V_VP8': 'vp8',
+                         b'V_VP9': 'vp9', b'V_AV1': 'av1'}
+IMAGE_SIGNATURES = [(b'\xff\xd8\xff', 'jpeg'), (b'\x89PNG\r\n\x1a\n', 'png'), (b'GIF87a', 'gif'),
+                    (b'GIF89a', 'gif')]
+
+
+class MediaProbeError(Exception):
+    pass
+
+
+class Probe:
+    """Reads at most ``max_bytes`` of a file and gives up once ``budget`` seconds have passed."""
+
+    def __init__(self, fileobj, max_bytes, budget):
+        self.file = fileobj
+        self.remaining = max_bytes
+        self.deadline = time.monotonic() + budget
+
+    def read(self, offset, size):
+        if time.monotonic() > self.deadline:
+            raise MediaProbeError("Не удалось проверить файл за отведённое время")
+        size = min(size, self.remaining)
+        self.file.seek(offset)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def file_size(fileobj):
+    fileobj.seek(0, io.SEEK_END)
+    return fileobj.tell()
+
+
+def probe_mp4(probe, size, head):
+    container = 'mov' if head[8:12] == b'qt  ' else 'mp4'
+    offset = 0
+    while offset + 8 <= size:
+        header = probe.read(offset, 16)
+        if len(header) < 8:
+            break
+        box_size, box_type = struct.unpack('>I4s', header[:8])
+        if box_size == 1 and len(header) == 16:
+            box_size = struct.unpack('>Q', header[8:16])[0]
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < 8:
+            break
+        if box_type == b'moov':
+            moov = probe.read(offset, box_size)
+            start = moov.find(b'stsd')
+            while start != -1:
+                codec = MP4_VIDEO_CODECS.get(moov[start + 16:start + 20])
+                if codec:
+                    return {'kind': 'video', 'container': container, 'codec': codec}
+                start = moov.find(b'stsd', start + 4)
+            raise MediaProbeError("В файле нет поддерживаемой видеодорожки")
+        offset += box_size
+    raise MediaProbeError("Файл повреждён или не содержит метаданных видео")
+
+
+def probe_matroska(probe, head):
+    data = head + probe.read(len(head), probe.remaining)
+    container = 'webm' if b'webm' in data[:64] else 'mkv'
+    for codec_id, codec in MATROSKA_VIDEO_CODECS.items():
+        if codec_id in data:
+            return {'kind': 'video', 'container': container, 'codec': codec}
+    raise MediaProbeError("В файле нет поддерживаемой видеодорожки")
+
+
+def probe_media(fileobj, max_bytes=None, budget=None):
+    """Identify container and codec of an upload from its headers, without decoding it.
+
+    Returns a dict with ``kind`` ('video' or 'image'), ``container`` and ``codec``; raises MediaProbeError for
+    anything unrecognised.
+    """
+    probe = Probe(fileobj, max_bytes or settings.MEDIA_PROBE_MAX_BYTES, budget or settings.MEDIA_PROBE_TIMEOUT)
+    try:
+        size = file_size(fileobj)
+        head = probe.read(0, 64)
+        for signature, image_format in IMAGE_SIGNATURES:
+            if head.startswith(signature):
+                return {'kind': 'image', 'container': image_format, 'codec': image_format}
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return {'kind': 'image', 'container': 'webp', 'codec': 'webp'}
+        if head[4:8] == b'ftyp':
+            return probe_mp4(probe, size, head)
+        if head[:4] == b'\x1a\x45\xdf\xa3':
+            return probe_matroska(probe, head)
+        raise MediaProbeError("Неизвестный формат файла")
+    finally:
+        fileobj.seek(0)
+
+
+def poster_frame(clip):
+    from PIL import Image
+    frame = clip.get_frame(min(1.0, clip.duration / 2))
+    output = io.BytesIO()
+    Image.fromarray(frame).save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+
+def analyse_media(obj):
+    """Decode ``obj.src`` and return the values to store on the model."""
+    from PIL import Image
+    values = {'media_status': MEDIA_READY}
+    if obj.type in VIDEO_TYPES:
+        from moviepy.editor import VideoFileClip
+        clip = VideoFileClip(obj.src.path, audio=False)
+        try:
+            values['duration'] = clip.duration
+            values['width'], values['height'] = clip.size
+            name = f'{obj._meta.model_name}_{obj.pk}.jpg'
+            obj.poster.save(name, ContentFile(poster_frame(clip)), save=False)
+            values['poster'] = obj.poster.name
+        finally:
+            clip.close()
+    else:
+        with obj.src.open('rb') as src, Image.open(src) as image:
+            values['width'], values['height'] = image.size
+    return values
+
+
+def process_media_jobs(limit=None):
+    """Run one round of the media queue and return the number of jobs handled."""
+    from .caching import invalidate
+    from .jobs import JOB_FAILED, claim_jobs, enqueue_job, finish_job
+    from .models import MediaJob, RenditionJob
+    jobs = claim_jobs(MediaJob, limit or settings.MEDIA_JOB_BATCH_SIZE)
+    for job in jobs:
+        model = job.content_type.model_class()
+        obj = model.objects.filter(pk=job.object_id).first()
+        if obj is None:
+            finish_job(job)
+            continue
+        try:
+            values = analyse_media(obj)
+        except Exception as error:
+            if finish_job(job, error, settings.MEDIA_JOB_MAX_ATTEMPTS) == JOB_FAILED:
+                model.objects.filter(pk=obj.pk).update(media_status=MEDIA_FAILED)
+                invalidate(obj)
+            continue
+        model.objects.filter(pk=obj.pk).update(**values)
+        invalidate(obj)
+        if values.get('poster'):
+            enqueue_job(RenditionJob, obj, field='poster')
+        finish_job(job)
+    return len(jobs)
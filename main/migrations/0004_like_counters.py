@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:23
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_like_counters(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('main', 'Like')
+    for model_name in ['news', 'posts', 'stories', 'comment']:
+        content_type = ContentType.objects.filter(app_label='main', model=model_name).first()
+        if content_type is None:
+            continue
+        counts = Like.objects.filter(content_type=content_type, object_id=OuterRef('pk')).order_by().values(
+            'object_id').annotate(total=Count('id')).values('total')
+        apps.get_model('main', model_name).objects.update(
+            likes_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_translation_memory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='stories',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_like_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0004_like_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-create_time', '-id'], name='comment_post_create_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['story', '-create_time', '-id'], name='comment_story_create_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['-create_time', '-id'], name='like_create_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-create_time', '-id'], name='news_create_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['-create_time', '-id'], name='posts_create_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stories',
+            index=models.Index(fields=['-create_time', '-id'], name='stories_create_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscribed_to', '-subscribed_date', '-id'], name='subscription_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscriber', '-subscribed_date', '-id'], name='subscription_from_date_idx'),
+        ),
+    ]
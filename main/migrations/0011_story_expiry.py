@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:38
+
+import main.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DateTimeField, ExpressionWrapper, F
+
+
+def expire_existing_stories(apps, schema_editor):
+    Stories = apps.get_model('main', 'Stories')
+    Stories.objects.update(expire_time=ExpressionWrapper(F('create_time') + settings.STORY_TTL,
+                                                         output_field=DateTimeField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stories',
+            name='expire_time',
+            field=models.DateTimeField(default=main.models.story_expiry),
+        ),
+        migrations.RunPython(expire_existing_stories, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='stories',
+            index=models.Index(fields=['expire_time', 'owner', 'create_time'], name='stories_expire_owner_idx'),
+        ),
+    ]
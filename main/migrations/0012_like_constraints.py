@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('main', 'Like')
+    duplicates = list(Like.objects.values('owner', 'content_type', 'object_id').annotate(
+        total=Count('id'), keep=Min('id')).filter(total__gt=1))
+    if not duplicates:
+        return
+    for group in duplicates:
+        Like.objects.filter(owner=group['owner'], content_type=group['content_type'],
+                            object_id=group['object_id']).exclude(id=group['keep']).delete()
+    for model_name in ['news', 'posts', 'stories', 'comment']:
+        content_type = ContentType.objects.filter(app_label='main', model=model_name).first()
+        if content_type is None:
+            continue
+        counts = Like.objects.filter(content_type=content_type, object_id=OuterRef('pk')).order_by().values(
+            'object_id').annotate(total=Count('id')).values('total')
+        apps.get_model('main', model_name).objects.update(
+            likes_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0011_story_expiry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['content_type', 'object_id'], name='like_content_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('owner', 'content_type', 'object_id'), name='unique_like'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class RunSQLOn(migrations.RunSQL):
+    """RunSQL that only runs on databases of one vendor."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0012_like_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('original', models.TextField(blank=True)),
+                ('en', models.TextField(blank=True)),
+                ('ru', models.TextField(blank=True)),
+                ('uz', models.TextField(blank=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_search_document'),
+        ),
+        # SQLite: an FTS5 index over main_searchdocument as an external-content table that triggers keep in sync.
+        RunSQLOn(
+            'sqlite',
+            [
+                "CREATE VIRTUAL TABLE main_searchdocument_fts USING fts5(original, en, ru, uz, "
+                "content='main_searchdocument', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+                "CREATE TRIGGER main_searchdocument_fts_insert AFTER INSERT ON main_searchdocument BEGIN "
+                "INSERT INTO main_searchdocument_fts(rowid, original, en, ru, uz) "
+                "VALUES (new.id, new.original, new.en, new.ru, new.uz); END",
+                "CREATE TRIGGER main_searchdocument_fts_delete AFTER DELETE ON main_searchdocument BEGIN "
+                "INSERT INTO main_searchdocument_fts(main_searchdocument_fts, rowid, original, en, ru, uz) "
+                "VALUES ('delete', old.id, old.original, old.en, old.ru, old.uz); END",
+                "CREATE TRIGGER main_searchdocument_fts_update AFTER UPDATE ON main_searchdocument BEGIN "
+                "INSERT INTO main_searchdocument_fts(main_searchdocument_fts, rowid, original, en, ru, uz) "
+                "VALUES ('delete', old.id, old.original, old.en, old.ru, old.uz); "
+                "INSERT INTO main_searchdocument_fts(rowid, original, en, ru, uz) "
+                "VALUES (new.id, new.original, new.en, new.ru, new.uz); END",
+            ],
+            ["DROP TABLE IF EXISTS main_searchdocument_fts"],
+        ),
+        # Postgres: a GIN expression index per language matching the tsvector built in main.search.search().
+        RunSQLOn(
+            'postgresql',
+            [
+                "CREATE INDEX main_search_en_idx ON main_searchdocument USING GIN "
+                "(to_tsvector('simple'::regconfig, COALESCE(en, '') || ' ' || COALESCE(original, '')))",
+                "CREATE INDEX main_search_ru_idx ON main_searchdocument USING GIN "
+                "(to_tsvector('simple'::regconfig, COALESCE(ru, '') || ' ' || COALESCE(original, '')))",
+                "CREATE INDEX main_search_uz_idx ON main_searchdocument USING GIN "
+                "(to_tsvector('simple'::regconfig, COALESCE(uz, '') || ' ' || COALESCE(original, '')))",
+            ],
+            [
+                "DROP INDEX IF EXISTS main_search_en_idx",
+                "DROP INDEX IF EXISTS main_search_ru_idx",
+                "DROP INDEX IF EXISTS main_search_uz_idx",
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:49
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_counters(apps, schema_editor):
+    Comment = apps.get_model('main', 'Comment')
+    for model_name, field in [('posts', 'post'), ('stories', 'story')]:
+        counts = Comment.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+            total=Count('id')).values('total')
+        apps.get_model('main', model_name).objects.update(
+            comments_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='stories',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_comment_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_subscriptions(apps, schema_editor):
+    Subscription = apps.get_model('main', 'Subscription')
+    duplicates = list(Subscription.objects.values('subscriber', 'subscribed_to').annotate(
+        total=Count('id'), keep=Min('id')).filter(total__gt=1))
+    for group in duplicates:
+        Subscription.objects.filter(subscriber=group['subscriber'], subscribed_to=group['subscribed_to']).exclude(
+            id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_comment_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('subscriber', 'subscribed_to'), name='unique_subscription'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_subscription_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediajob',
+            name='claim',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='renditionjob',
+            name='claim',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='claim',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:34
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_pending_jobs(apps, schema_editor):
+    for name, keys in [('TranslationJob', ['content_type', 'object_id']), ('MediaJob', ['content_type', 'object_id']),
+                       ('RenditionJob', ['content_type', 'object_id', 'field'])]:
+        Job = apps.get_model('main', name)
+        pending = Job.objects.filter(status='pending')
+        duplicates = list(pending.values(*keys).annotate(total=Count('id'), keep=Min('id')).filter(total__gt=1))
+        for group in duplicates:
+            pending.filter(**{key: group[key] for key in keys}).exclude(id=group['keep']).delete()
+            if name == 'TranslationJob':
+                # The dropped jobs may have named other fields: translate them all.
+                Job.objects.filter(id=group['keep']).update(fields='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('main', '0016_job_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediajob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='renditionjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='mediajob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='mediajob_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='renditionjob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='renditionjob_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationjob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='translationjob_due_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_pending_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mediajob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('content_type', 'object_id'), name='mediajob_one_pending'),
+        ),
+        migrations.AddConstraint(
+            model_name='renditionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('content_type', 'object_id', 'field'), name='renditionjob_one_pending'),
+        ),
+        migrations.AddConstraint(
+            model_name='translationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('content_type', 'object_id'), name='translationjob_one_pending'),
+        ),
+    ]
@@ -1,16 +1,29 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+import uuid
+from asgiref.sync import sync_to_async
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .translation import translate_text
-from django.db import models
+from .caching import bump_versions, invalidate
+from .jobs import enqueue_job, JOB_STATUS_CHOICES, JOB_PENDING
+from .media import MEDIA_STATUS_CHOICES, MEDIA_PENDING, PHOTO_TYPES
+from .sqlite import serialized_write
+from .uploads import UPLOAD_STATUS_CHOICES, UPLOAD_OPEN
+from .translation import enqueue_translation, TRANSLATION_STATUS_CHOICES, TRANSLATION_PENDING
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.utils import timezone
 
 TYPE_CHOICES_TRANSLATIONS = {
     'ru': [('Видео', 'Видео'), ('Фото', 'Фото')],
     'en': [('Видео', 'Video'), ('Фото', 'Photo')],
     'uz': [('Видео', 'Video'), ('Фото', 'Foto')],
 }
+# The User fields OwnerSerializer renders inside cached post and story lists.
+OWNER_USER_FIELDS = {'first_name', 'last_name', 'username', 'email', 'is_active', 'date_joined'}
 
 
 class Subscription(models.Model):
@@ -19,13 +32,77 @@ class Subscription(models.Model):
     subscriber_subscribed_date = models.DateTimeField(auto_now_add=True)
     subscribed_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['subscribed_to', '-subscribed_date', '-id'], name='subscription_to_date_idx'),
+            models.Index(fields=['subscriber', '-subscribed_date', '-id'], name='subscription_from_date_idx'),
+        ]
+        constraints = [models.UniqueConstraint(fields=['subscriber', 'subscribed_to'], name='unique_subscription')]
+
+
+def count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total'), output_field=IntegerField()), 0)
+
+
+class UserProfileQuerySet(models.QuerySet):
+    def with_counts(self):
+        return self.annotate(
+            posts_count=count_subquery(Posts.objects.all(), 'owner'),
+            stories_count=count_subquery(Stories.objects.all(), 'owner'),
+            comments_count=count_subquery(Comment.objects.all(), 'owner'),
+            likes_count=count_subquery(Like.objects.all(), 'owner'),
+            subscribers_count=count_subquery(Subscription.objects.all(), 'subscribed_to'),
+            subscribes_count=count_subquery(Subscription.objects.all(), 'subscriber'),
+        )
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
     banner = models.ImageField(upload_to='banners/', null=True, blank=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    banner_renditions = models.JSONField(default=dict, blank=True, editable=False)
     subscriptions = models.ManyToManyField('self', through='Subscription', symmetrical=False)
 
+    objects = UserProfileQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_images = {field: instance.__dict__.get(field) for field in ['avatar', 'banner']}
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_images', {})
+        changed = [field for field in ['avatar', 'banner']
+                   if field in self.__dict__ and loaded.get(field) != getattr(self, field)
+                   and (loaded.get(field) or getattr(self, field))]
+        super().save(*args, **kwargs)
+        for field in changed:
+            enqueue_job(RenditionJob, self, field=field)
+        if changed:
+            bump_versions('userprofile')
+        self._loaded_images = {field: self.__dict__.get(field) for field in ['avatar', 'banner']}
+
+    @serialized_write
+    def subscribe(self, profile):
+        """Follow ``profile``; returns False if already following it."""
+        _, created = Subscription.objects.get_or_create(subscriber=self, subscribed_to=profile)
+        return created
+
+    @serialized_write
+    def unsubscribe(self, profile):
+        """Stop following ``profile``; returns False if it was not followed."""
+        deleted, _ = Subscription.objects.filter(subscriber=self, subscribed_to=profile).delete()
+        return bool(deleted)
+
+    async def asubscribe(self, profile):
+        return await sync_to_async(self.subscribe)(profile)
+
+    async def aunsubscribe(self, profile):
+        return await sync_to_async(self.unsubscribe)(profile)
+
     @receiver(post_save, sender=User)
     def create_user_profile(sender, instance, created, **kwargs):
         if created:
@@ -39,7 +116,163 @@ class UserProfile(models.Model):
         return self.user.username
 
 
-class News(models.Model):
+class TranslatableModel(models.Model):
+    translatable_fields = []
+    translation_status = models.CharField(max_length=10, choices=TRANSLATION_STATUS_CHOICES,
+                                          default=TRANSLATION_PENDING, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._translation_sources = {field: instance.__dict__[field] for field in cls.translatable_fields
+                                         if field in instance.__dict__}
+        return instance
+
+    def changed_translatable_fields(self):
+        if self._state.adding:
+            return list(self.translatable_fields)
+        sources = getattr(self, '_translation_sources', {})
+        return [field for field in self.translatable_fields
+                if field in self.__dict__ and sources.get(field) != self.__dict__[field]]
+
+    def save(self, *args, **kwargs):
+        changed = self.changed_translatable_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            changed = [field for field in changed if field in update_fields]
+        if changed:
+            self.translation_status = TRANSLATION_PENDING
+            if update_fields is not None:
+                kwargs['update_fields'] = list(update_fields) + ['translation_status']
+        super().save(*args, **kwargs)
+        if changed:
+            enqueue_translation(self, changed)
+        self._translation_sources = {field: self.__dict__[field] for field in self.translatable_fields
+                                     if field in self.__dict__}
+
+    class Meta:
+        abstract = True
+
+
+class LikeableModel(models.Model):
+    counter_fields = ['likes_count']
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        # Counters are maintained with F() updates; a full save must not overwrite them with stale values.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.counter_fields]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class CommentableModel(models.Model):
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def comments_preview(self):
+        """The newest COMMENT_PREVIEW_SIZE comments; list views prefetch them per page as ``latest_comments``."""
+        if hasattr(self, 'latest_comments'):
+            return self.latest_comments
+        return list(self.comments.select_related('owner__user').order_by('-create_time', '-id')[
+            :settings.COMMENT_PREVIEW_SIZE])
+
+    class Meta:
+        abstract = True
+
+
+class Job(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default=JOB_PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claim = models.CharField(max_length=32, blank=True, editable=False)
+    # When a pending job may be tried again, or when the lease of a running one runs out.
+    next_attempt_at = models.DateTimeField(default=timezone.now, editable=False)
+    error = models.TextField(blank=True)
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.content_type.model} #{self.object_id}: {self.status}'
+
+    class Meta:
+        abstract = True
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='%(class)s_due_idx')]
+        constraints = [models.UniqueConstraint(fields=['content_type', 'object_id'], condition=Q(status=JOB_PENDING),
+                                               name='%(class)s_one_pending')]
+
+
+class TranslationJob(Job):
+    fields = models.CharField(max_length=100, blank=True)
+
+    @property
+    def field_list(self):
+        return [field for field in self.fields.split(',') if field]
+
+
+class MediaJob(Job):
+    pass
+
+
+class RenditionJob(Job):
+    field = models.CharField(max_length=20)
+
+    class Meta(Job.Meta):
+        constraints = [models.UniqueConstraint(fields=['content_type', 'object_id', 'field'],
+                                               condition=Q(status=JOB_PENDING), name='renditionjob_one_pending')]
+
+
+class MediaModel(models.Model):
+    media_status = models.CharField(max_length=10, choices=MEDIA_STATUS_CHOICES, default=MEDIA_PENDING,
+                                    editable=False)
+    media_container = models.CharField(max_length=20, blank=True, editable=False)
+    media_codec = models.CharField(max_length=20, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    duration = models.FloatField(null=True, blank=True, editable=False)
+    poster = models.ImageField(upload_to='posters/', null=True, blank=True, editable=False)
+    src_renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_src = instance.__dict__.get('src')
+        return instance
+
+    def save(self, *args, **kwargs):
+        changed = self._state.adding or ('src' in self.__dict__ and getattr(self, '_loaded_src', None) != self.src)
+        if changed:
+            self.media_status = MEDIA_PENDING
+        super().save(*args, **kwargs)
+        if changed:
+            enqueue_job(MediaJob, self)
+            if self.type in PHOTO_TYPES:
+                enqueue_job(RenditionJob, self, field='src')
+        self._loaded_src = self.__dict__.get('src')
+
+    class Meta:
+        abstract = True
+
+
+class TranslationMemory(models.Model):
+    source_hash = models.CharField(max_length=64)
+    language = models.CharField(max_length=5)
+    translation = models.TextField()
+    create_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['source_hash', 'language'], name='unique_translation_memory')]
+
+    def __str__(self):
+        return f'{self.language}: {self.translation[:50]}'
+
+
+class News(TranslatableModel, LikeableModel, MediaModel):
+    translatable_fields = ['title', 'body']
     id = models.AutoField(primary_key=True)
     type = models.CharField(max_length=5, choices=TYPE_CHOICES_TRANSLATIONS)
     src = models.FileField(upload_to='src/')
@@ -53,24 +286,18 @@ class News(models.Model):
     body_uz = models.TextField(blank=True)
     create_time = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        self.title_en = translate_text(self.title, 'en')
-        self.title_ru = translate_text(self.title, 'ru')
-        self.title_uz = translate_text(self.title, 'uz')
-        self.body_en = translate_text(self.body, 'en')
-        self.body_ru = translate_text(self.body, 'ru')
-        self.body_uz = translate_text(self.body, 'uz')
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.title
 
     class Meta():
         verbose_name = "News"
         verbose_name_plural = "News"
+        indexes = [models.Index(fields=['-create_time', '-id'], name='news_create_time_id_idx')]
 
 
-class Posts(models.Model):
+class Posts(TranslatableModel, LikeableModel, CommentableModel, MediaModel):
+    translatable_fields = ['title', 'body']
+    counter_fields = ['likes_count', 'comments_count']
     id = models.AutoField(primary_key=True)
     type = models.CharField(max_length=5, choices=TYPE_CHOICES_TRANSLATIONS)
     src = models.FileField(upload_to='src/')
@@ -85,24 +312,30 @@ class Posts(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='posts')
 
-    def save(self, *args, **kwargs):
-        self.title_en = translate_text(self.title, 'en')
-        self.title_ru = translate_text(self.title, 'ru')
-        self.title_uz = translate_text(self.title, 'uz')
-        self.body_en = translate_text(self.body, 'en')
-        self.body_ru = translate_text(self.body, 'ru')
-        self.body_uz = translate_text(self.body, 'uz')
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.title
 
     class Meta():
         verbose_name = "Post"
         verbose_name_plural = "Posts"
+        indexes = [models.Index(fields=['-create_time', '-id'], name='posts_create_time_id_idx')]
+
+
+def story_expiry():
+    return timezone.now() + settings.STORY_TTL
+
+
+class StoriesQuerySet(models.QuerySet):
+    def active(self, now=None):
+        return self.filter(expire_time__gt=now or timezone.now())
+
+    def expired(self, now=None):
+        return self.filter(expire_time__lte=now or timezone.now())
 
 
-class Stories(models.Model):
+class Stories(TranslatableModel, LikeableModel, CommentableModel, MediaModel):
+    translatable_fields = ['title']
+    counter_fields = ['likes_count', 'comments_count']
     id = models.AutoField(primary_key=True)
     type = models.CharField(max_length=5, choices=TYPE_CHOICES_TRANSLATIONS)
     src = models.FileField(upload_to='src/')
@@ -111,13 +344,10 @@ class Stories(models.Model):
     title_ru = models.TextField(blank=True)
     title_uz = models.TextField(blank=True)
     create_time = models.DateTimeField(auto_now_add=True)
+    expire_time = models.DateTimeField(default=story_expiry)
     owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='stories')
 
-    def save(self, *args, **kwargs):
-        self.title_en = translate_text(self.title, 'en')
-        self.title_ru = translate_text(self.title, 'ru')
-        self.title_uz = translate_text(self.title, 'uz')
-        super().save(*args, **kwargs)
+    objects = StoriesQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -125,9 +355,14 @@ class Stories(models.Model):
     class Meta():
         verbose_name = "Story"
         verbose_name_plural = "Stories"
+        indexes = [
+            models.Index(fields=['-create_time', '-id'], name='stories_create_time_id_idx'),
+            models.Index(fields=['expire_time', 'owner', 'create_time'], name='stories_expire_owner_idx'),
+        ]
 
 
-class Comment(models.Model):
+class Comment(TranslatableModel, LikeableModel):
+    translatable_fields = ['body']
     id = models.AutoField(primary_key=True)
     body = models.TextField()
     body_en = models.TextField(blank=True)
@@ -138,16 +373,72 @@ class Comment(models.Model):
     post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='comments', null=True, blank=True)
     story = models.ForeignKey(Stories, on_delete=models.CASCADE, related_name='comments', null=True, blank=True)
 
-    def save(self, *args, **kwargs):
-        self.body_en = translate_text(self.body, 'en')
-        self.body_ru = translate_text(self.body, 'ru')
-        self.body_uz = translate_text(self.body, 'uz')
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-create_time', '-id'], name='comment_post_create_time_idx'),
+            models.Index(fields=['story', '-create_time', '-id'], name='comment_story_create_time_idx'),
+        ]
 
     def __str__(self):
         return self.owner.user.username
 
 
+class LikeManager(models.Manager):
+    @serialized_write
+    def add(self, owner, obj):
+        """Insert the like in a single INSERT ... ON CONFLICT DO NOTHING; returns True if a row was inserted."""
+        content_type = ContentType.objects.get_for_model(obj)
+        using = self._db or router.db_for_write(self.model)
+        connection = connections[using]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {table} (owner_id, content_type_id, object_id, create_time) '
+                           f'VALUES (%s, %s, %s, %s) ON CONFLICT (owner_id, content_type_id, object_id) DO NOTHING',
+                           [owner.pk, content_type.pk, obj.pk,
+                            connection.ops.adapt_datetimefield_value(timezone.now())])
+            created = cursor.rowcount == 1
+            if created:
+                obj.__class__.objects.using(using).filter(pk=obj.pk).update(likes_count=F('likes_count') + 1)
+                invalidate(obj)
+        return created
+
+    @serialized_write
+    def remove(self, owner, obj):
+        content_type = ContentType.objects.get_for_model(obj)
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            # Like has no cascades or delete signals, so this is a single fast DELETE.
+            deleted, _ = self.using(using).filter(owner=owner, content_type=content_type, object_id=obj.pk).delete()
+            if deleted:
+                obj.__class__.objects.using(using).filter(pk=obj.pk).update(likes_count=F('likes_count') - deleted)
+                invalidate(obj)
+        return bool(deleted)
+
+    # The writes need a transaction, which is not available in async code: run them whole in the sync thread.
+    async def aadd(self, owner, obj):
+        return await sync_to_async(self.add)(owner, obj)
+
+    async def aremove(self, owner, obj):
+        return await sync_to_async(self.remove)(owner, obj)
+
+    def states(self, owner, keys):
+        """Map each (content_type_id, object_id) in ``keys`` to (like count, liked by ``owner``) with one query."""
+        by_type = {}
+        for content_type_id, object_id in keys:
+            by_type.setdefault(content_type_id, set()).add(object_id)
+        query = Q()
+        for content_type_id, object_ids in by_type.items():
+            query |= Q(content_type_id=content_type_id, object_id__in=object_ids)
+        states = {key: (0, False) for key in keys}
+        if not by_type:
+            return states
+        rows = self.filter(query).order_by().values('content_type_id', 'object_id').annotate(
+            total=Count('id'), liked=Count('id', filter=Q(owner_id=getattr(owner, 'pk', None))))
+        for row in rows:
+            states[(row['content_type_id'], row['object_id'])] = (row['total'], row['liked'] > 0)
+        return states
+
+
 class Like(models.Model):
     id = models.AutoField(primary_key=True)
     owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
@@ -156,5 +447,154 @@ class Like(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
     create_time = models.DateTimeField(auto_now_add=True)
 
+    objects = LikeManager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['owner', 'content_type', 'object_id'], name='unique_like')]
+        indexes = [
+            models.Index(fields=['-create_time', '-id'], name='like_create_time_id_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='like_content_idx'),
+        ]
+
     def __str__(self):
         return self.owner.user.username
+
+
+class TimelineEntry(models.Model):
+    owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='timeline')
+    author = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    create_time = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['owner', 'content_type', 'object_id'],
+                                               name='unique_timeline_entry')]
+        indexes = [
+            models.Index(fields=['owner', '-create_time', '-id'], name='timeline_owner_time_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='timeline_content_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner}: {self.content_type.model} #{self.object_id}'
+
+
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Stories)
+def fan_out_content(sender, instance, created, **kwargs):
+    if created:
+        from .timeline import fan_out
+        fan_out(instance)
+
+
+@receiver(post_delete, sender=Posts)
+@receiver(post_delete, sender=Stories)
+def remove_content_from_timelines(sender, instance, **kwargs):
+    TimelineEntry.objects.filter(content_type=ContentType.objects.get_for_model(instance),
+                                 object_id=instance.pk).delete()
+
+
+def adjust_comments_count(comment, delta):
+    if comment.post_id:
+        Posts.objects.filter(pk=comment.post_id).update(comments_count=F('comments_count') + delta)
+    elif comment.story_id:
+        Stories.objects.filter(pk=comment.story_id).update(comments_count=F('comments_count') + delta)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        adjust_comments_count(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    adjust_comments_count(instance, -1)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Stories)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Posts)
+@receiver(post_delete, sender=Stories)
+@receiver(post_delete, sender=Comment)
+def invalidate_cached_lists(sender, instance, **kwargs):
+    invalidate(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_lists(sender, instance, created, update_fields=None, **kwargs):
+    """Lists embed their owners' user fields; a login only updates last_login, which none of them show."""
+    if not created and (update_fields is None or not OWNER_USER_FIELDS.isdisjoint(update_fields)):
+        bump_versions('userprofile')
+
+
+@receiver(post_save, sender=Subscription)
+def fill_timeline_on_subscribe(sender, instance, created, **kwargs):
+    if created:
+        from .timeline import backfill_timeline
+        backfill_timeline(instance.subscriber, authors=[instance.subscribed_to_id])
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_timeline_on_unsubscribe(sender, instance, **kwargs):
+    TimelineEntry.objects.filter(owner_id=instance.subscriber_id, author_id=instance.subscribed_to_id).delete()
+
+
+class SearchDocument(models.Model):
+    """The searchable text of one object: the original and one column per language, indexed by main.search."""
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    original = models.TextField(blank=True)
+    en = models.TextField(blank=True)
+    ru = models.TextField(blank=True)
+    uz = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['content_type', 'object_id'], name='unique_search_document')]
+
+    def __str__(self):
+        return f'{self.content_type.model} #{self.object_id}'
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Stories)
+@receiver(post_save, sender=Comment)
+def index_for_search(sender, instance, **kwargs):
+    from .search import index_objects
+    index_objects([instance])
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Posts)
+@receiver(post_delete, sender=Stories)
+@receiver(post_delete, sender=Comment)
+def remove_from_search(sender, instance, **kwargs):
+    SearchDocument.objects.filter(content_type=ContentType.objects.get_for_model(instance),
+                                  object_id=instance.pk).delete()
+
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=UPLOAD_STATUS_CHOICES, default=UPLOAD_OPEN, db_index=True)
+    name = models.CharField(max_length=255, blank=True)
+    media_kind = models.CharField(max_length=10, blank=True)
+    media_container = models.CharField(max_length=20, blank=True)
+    media_codec = models.CharField(max_length=20, blank=True)
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size})'
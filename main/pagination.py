@@ -0,0 +1,128 @@
+import base64
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Newest-first keyset pagination on (ordering_field, id).
+
+    The cursor is an opaque token holding the (ordering_field, id) of the row the page starts after, so every page is
+    an indexed range scan no matter how deep it is.
+    """
+
+    ordering_field = 'create_time'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['reverse']
+        field = self.ordering_field
+        if self.reverse:
+            queryset = queryset.order_by(field, 'id')
+        else:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        if cursor is not None:
+            value, pk = cursor['value'], cursor['id']
+            lookup = 'gt' if self.reverse else 'lt'
+            queryset = queryset.filter(Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk}))
+        results = list(queryset[:self.size + 1])
+        has_more = len(results) > self.size
+        results = results[:self.size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.API_PAGE_SIZE
+        return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            value = parse_datetime(data['t'])
+            if value is None:
+                raise ValueError
+            return {'value': value, 'id': int(data['i']), 'reverse': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def first_page(self, queryset, request, url):
+        """Render the first page of ``queryset`` with a next link to ``url``, for collections embedded in a parent."""
+        self.base_url = request.build_absolute_uri(url)
+        self.size = settings.API_PAGE_SIZE
+        results = list(queryset.order_by(f'-{self.ordering_field}', '-id')[:self.size + 1])
+        self.has_next, self.has_previous, self.page = len(results) > self.size, False, results[:self.size]
+        return self.page
+
+    def encode_cursor(self, obj, reverse):
+        value = obj
+        for attr in self.ordering_field.split('__'):
+            value = getattr(value, attr)
+        data = {'t': value.isoformat(), 'i': obj.pk}
+        if reverse:
+            data['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_data(self, data):
+        return {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class UserKeysetPagination(KeysetPagination):
+    ordering_field = 'user__date_joined'
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+    ordering_field = 'subscribed_date'
+
+
+class StoryTrayPagination(KeysetPagination):
+    ordering_field = 'latest_story'
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """The shape of a statement: literals and placeholders become ``?`` and ``IN`` lists of any length ``(...)``."""
+    sql = STRING_RE.sub('?', sql).replace('%s', '?')
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that times every statement and groups them by shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.shape_durations = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            shape = normalize_sql(sql)
+            self.count += 1
+            self.duration += elapsed
+            self.shapes[shape] += 1
+            self.shape_durations[shape] += elapsed
+
+    def repeated(self, limit):
+        return [{'sql': shape, 'count': count, 'time_ms': round(self.shape_durations[shape] * 1000, 3)}
+                for shape, count in self.shapes.most_common(limit) if count > 1]
+
+    def n_plus_one(self, threshold):
+        return [shape for shape, count in self.shapes.items() if count > threshold]
+
+
+class SlowRequestLog:
+    """The ``size`` slowest request profiles seen by this process, kept in a bounded min-heap."""
+
+    def __init__(self, size):
+        self.size = size
+        self.heap = []
+        self.order = itertools.count()
+        self.lock = threading.Lock()
+
+    def record(self, profile):
+        item = (profile['total_ms'], next(self.order), profile)
+        with self.lock:
+            if len(self.heap) < self.size:
+                heapq.heappush(self.heap, item)
+            elif item[0] > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+
+    def entries(self):
+        with self.lock:
+            return [profile for _, _, profile in sorted(self.heap, key=lambda item: (-item[0], item[1]))]
+
+    def clear(self):
+        with self.lock:
+            self.heap.clear()
+
+
+slow_requests = SlowRequestLog(settings.SQL_PROFILING_SLOW_REQUESTS)
+
+
+class SQLProfilingMiddleware:
+    """Opt-in (SQL_PROFILING) per-request SQL profile.
+
+    Counts queries and DB time on every connection, reports them in a ``Server-Timing`` header, flags statement
+    shapes that ran more than SQL_PROFILING_N_PLUS_ONE_THRESHOLD times as N+1 patterns and keeps the slowest
+    requests for /profiling/slow-requests/. Queries run while a streaming response is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_PROFILING:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.install(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.SQL_PROFILING:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # The async ORM and sync views of a request share its thread-sensitive executor thread, so that thread's
+        # connections are the ones to hook.
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    def install(self, stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def finish(self, request, response, recorder, total):
+        n_plus_one = recorder.n_plus_one(settings.SQL_PROFILING_N_PLUS_ONE_THRESHOLD)
+        profile = {
+            'time': timezone.now().isoformat(), 'method': request.method, 'path': request.get_full_path(),
+            'status': response.status_code, 'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 3), 'total_ms': round(total * 1000, 3),
+            'repeated': recorder.repeated(settings.SQL_PROFILING_TOP_SHAPES), 'n_plus_one': n_plus_one,
+        }
+        slow_requests.record(profile)
+        if n_plus_one:
+            logger.warning('N+1 queries in %s %s: %s', request.method, profile['path'], '; '.join(n_plus_one))
+
+        timings = [f'db;dur={profile["db_ms"]};desc="{recorder.count} queries"', f'total;dur={profile["total_ms"]}']
+        if n_plus_one:
+            timings.append(f'nplusone;desc="{len(n_plus_one)} repeated shapes"')
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+        return response
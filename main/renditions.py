@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from PIL import Image, ImageOps
+from .caching import invalidate
+
+RENDITION_TARGETS = {'avatar': 'avatar_renditions', 'banner': 'banner_renditions', 'src': 'src_renditions',
+                     'poster': 'src_renditions'}
+FORMAT_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def rendition_prefix(obj, field):
+    """Where the renditions of ``obj.field`` go: a folder of their own, so they can never replace an upload.
+
+    The source's file name is part of it, so a new upload gets new URLs instead of ones browsers have cached.
+    """
+    stem = os.path.splitext(os.path.basename(getattr(obj, field).name))[0]
+    return f'renditions/{obj._meta.model_name}/{obj.pk}/{field}/{stem}'
+
+
+def render_renditions(media_root, name, prefix, sizes, formats, quality):
+    """Write resized, re-encoded copies of ``media_root/name`` as ``prefix_<size>.<ext>`` and return
+    {size: {format: name}}.
+
+    Works on plain paths without touching the database so it can run in a process pool.
+    """
+    os.makedirs(os.path.join(media_root, os.path.dirname(prefix)), exist_ok=True)
+    renditions = {}
+    with Image.open(os.path.join(media_root, name)) as original:
+        image = ImageOps.exif_transpose(original)
+        longest = max(image.size)
+        for size in sorted(sizes):
+            if size > longest and renditions:
+                break
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            renditions[str(size)] = {}
+            for image_format in formats:
+                output = f'{prefix}_{size}.{FORMAT_EXTENSIONS[image_format]}'
+                frame = resized
+                if image_format == 'jpeg' and frame.mode != 'RGB':
+                    frame = Image.new('RGB', frame.size, 'white')
+                    frame.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+                frame.save(os.path.join(media_root, output), format=image_format.upper(), quality=quality)
+                renditions[str(size)][image_format] = output
+    return renditions
+
+
+def render_options():
+    return settings.RENDITION_SIZES, settings.RENDITION_FORMATS, settings.RENDITION_QUALITY
+
+
+def remove_stale(old, new):
+    keep = {name for formats in new.values() for name in formats.values()}
+    for formats in (old or {}).values():
+        for name in formats.values():
+            if name not in keep and os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+                os.remove(os.path.join(settings.MEDIA_ROOT, name))
+
+
+def store_renditions(obj, field, renditions):
+    target = RENDITION_TARGETS[field]
+    remove_stale(getattr(obj, target), renditions)
+    obj.__class__.objects.filter(pk=obj.pk).update(**{target: renditions})
+    invalidate(obj)
+
+
+def process_rendition_jobs(limit=None):
+    """Run one round of the rendition queue and return the number of jobs handled."""
+    from .jobs import claim_jobs, finish_job
+    from .models import RenditionJob
+    jobs = claim_jobs(RenditionJob, limit or settings.MEDIA_JOB_BATCH_SIZE)
+    for job in jobs:
+        obj = job.content_type.model_class().objects.filter(pk=job.object_id).first()
+        if obj is None:
+            finish_job(job)
+            continue
+        try:
+            source = getattr(obj, job.field)
+            renditions = render_renditions(settings.MEDIA_ROOT, source.name, rendition_prefix(obj, job.field),
+                                           *render_options()) if source else {}
+        except Exception as error:
+            finish_job(job, error, settings.MEDIA_JOB_MAX_ATTEMPTS)
+            continue
+        store_renditions(obj, job.field, renditions)
+        finish_job(job)
+    return len(jobs)
+
+
+def backfill_renditions(items, workers=None):
+    """Render ``items`` ((obj, field) pairs) on a process pool and store the results; returns (done, failed)."""
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(obj, field, executor.submit(render_renditions, settings.MEDIA_ROOT, getattr(obj, field).name,
+                                                rendition_prefix(obj, field), *render_options()))
+                   for obj, field in items]
+        for obj, field, future in futures:
+            try:
+                store_renditions(obj, field, future.result())
+                done += 1
+            except Exception:
+                failed += 1
+    return done, failed
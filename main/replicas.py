@@ -0,0 +1,166 @@
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Sessions, accounts and content types are read right after being written (login, signup, get_for_model).
+PRIMARY_ONLY_APPS = {'sessions', 'auth', 'authtoken', 'account', 'sites', 'contenttypes'}
+
+
+class RoutingState:
+    """Where the reads of one request or block may go; ``wrote`` turns replica reads off for the rest of it."""
+
+    def __init__(self, replica_reads, request=None):
+        self.replica_reads = replica_reads
+        self.request = request
+        self.wrote = False
+        self.pinned = None
+        self.replica = None
+
+
+routing_state = ContextVar('routing_state', default=None)
+
+
+def pin_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def request_user_id(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def is_pinned(request):
+    """Whether the user of ``request`` wrote within the last REPLICA_STICKY_SECONDS."""
+    user_id = request_user_id(request) if request is not None else None
+    return user_id is not None and caches[settings.REPLICA_PIN_CACHE_ALIAS].get(pin_key(user_id)) is not None
+
+
+def pin_to_primary(user_id):
+    caches[settings.REPLICA_PIN_CACHE_ALIAS].set(pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def replica_for(state):
+    """The replica ``state`` reads from, or None when its reads must see the primary."""
+    if state is None or not state.replica_reads or state.wrote or not settings.DATABASE_REPLICAS:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    if state.pinned is None:
+        state.pinned = is_pinned(state.request)
+    if state.pinned:
+        return None
+    if state.replica is None:
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+    return state.replica
+
+
+def reading_from_replica():
+    return replica_for(routing_state.get()) is not None
+
+
+@contextmanager
+def route(state):
+    """Route the queries of the block by ``state``; a write inside it also counts as a write of the enclosing block."""
+    outer = routing_state.get()
+    token = routing_state.set(state)
+    try:
+        yield state
+    finally:
+        routing_state.reset(token)
+        if outer is not None and state.wrote:
+            outer.wrote = True
+
+
+def replica_reads(request=None):
+    """Send the reads of the block to a replica, unless it writes or ``request``'s user is pinned to the primary."""
+    return route(RoutingState(True, request))
+
+
+def primary(view):
+    """Make every query of ``view`` (sync or async) go to the primary, e.g. for actions that read what they write."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with route(RoutingState(False)):
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with route(RoutingState(False)):
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Writes go to the primary (``default``); reads go to a DATABASE_REPLICAS alias only inside replica_reads()."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return replica_for(routing_state.get()) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Lets safe-method requests read from replicas and pins users who wrote to the primary for a short window."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with route(RoutingState(request.method in SAFE_METHODS, request)) as state:
+            response = self.get_response(request)
+        self.finish(request, state)
+        return response
+
+    async def __acall__(self, request):
+        with route(RoutingState(request.method in SAFE_METHODS, request)) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            await sync_to_async(self.finish)(request, state)
+        return response
+
+    def finish(self, request, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            user_id = request_user_id(request)
+            if user_id is not None:
+                pin_to_primary(user_id)
+
+
+def sync_replicas():
+    """Copy the SQLite primary into every SQLite replica; run on a timer, this simulates replication lag locally."""
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    for alias in settings.DATABASE_REPLICAS:
+        target = connections[alias]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise ValueError('Only SQLite replicas can be synced by copying the primary.')
+        target.ensure_connection()
+        source.connection.backup(target.connection)
@@ -0,0 +1,104 @@
+import re
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from .translation import TRANSLATION_LANGUAGES
+
+FTS_TABLE = 'main_searchdocument_fts'
+SEARCH_COLUMNS = ['original'] + TRANSLATION_LANGUAGES
+
+# The FTS5 table (SQLite) and the per-language GIN indexes (Postgres) are created by migration 0013.
+
+
+def search_models():
+    from .models import Comment, News, Posts, Stories
+    return [News, Posts, Stories, Comment]
+
+
+def document_values(obj):
+    def text(suffix):
+        return '\n'.join(getattr(obj, field + suffix) or '' for field in obj.translatable_fields)
+    values = {'original': text('')}
+    for lang in TRANSLATION_LANGUAGES:
+        values[lang] = text(f'_{lang}')
+    return values
+
+
+def index_objects(objects):
+    """Insert or refresh the search documents of ``objects`` with one upsert per content type."""
+    from .models import SearchDocument
+    by_type = {}
+    for obj in objects:
+        by_type.setdefault(ContentType.objects.get_for_model(obj), []).append(obj)
+    for content_type, items in by_type.items():
+        documents = [SearchDocument(content_type=content_type, object_id=obj.pk, **document_values(obj))
+                     for obj in items]
+        SearchDocument.objects.bulk_create(documents, update_conflicts=True, update_fields=SEARCH_COLUMNS,
+                                           unique_fields=['content_type', 'object_id'])
+
+
+def rebuild_index(chunk_size=None, models=None):
+    """Re-index every searchable row, walking each table by primary key ``chunk_size`` rows at a time.
+
+    Yields (model, indexed so far) after each chunk so callers can report progress.
+    """
+    from .models import SearchDocument
+    chunk_size = chunk_size or settings.SEARCH_REBUILD_CHUNK_SIZE
+    for model in models or search_models():
+        columns = ['id'] + [field + suffix for field in model.translatable_fields
+                            for suffix in [''] + [f'_{lang}' for lang in TRANSLATION_LANGUAGES]]
+        content_type = ContentType.objects.get_for_model(model)
+        last_id, indexed = 0, 0
+        while True:
+            chunk = list(model.objects.filter(id__gt=last_id).order_by('id').only(*columns)[:chunk_size])
+            with transaction.atomic():
+                stale = SearchDocument.objects.filter(content_type=content_type, object_id__gt=last_id)
+                if chunk:
+                    stale = stale.filter(object_id__lte=chunk[-1].pk).exclude(object_id__in=[obj.pk for obj in chunk])
+                stale.delete()
+                index_objects(chunk)
+            if not chunk:
+                break
+            last_id, indexed = chunk[-1].pk, indexed + len(chunk)
+            yield model, indexed
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query)[:settings.SEARCH_MAX_TERMS]
+
+
+def search(query, lang, content_types=None, limit=20, offset=0):
+    """Return SearchDocuments matching every word of ``query`` as a prefix, best match first, with ``rank`` set.
+
+    Matches are looked up in the ``lang`` column and the original text.
+    """
+    from .models import SearchDocument
+    terms = search_terms(query)
+    if not terms or lang not in TRANSLATION_LANGUAGES:
+        return []
+    type_ids = [content_type.id for content_type in content_types or []]
+    if connection.vendor == 'sqlite':
+        prefixes = ' AND '.join('"%s"*' % term for term in terms)
+        where = f'AND d.content_type_id IN ({", ".join(["%s"] * len(type_ids))})' if type_ids else ''
+        return list(SearchDocument.objects.raw(
+            f'SELECT d.*, -bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} '
+            f'JOIN main_searchdocument d ON d.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s {where} '
+            f'ORDER BY bm25({FTS_TABLE}), d.id LIMIT %s OFFSET %s',
+            [f'{{{lang} original}} : ({prefixes})', *type_ids, limit, offset]))
+    documents = SearchDocument.objects.all()
+    if type_ids:
+        documents = documents.filter(content_type_id__in=type_ids)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        vector = SearchVector(lang, 'original', config='simple')
+        ts_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+        return list(documents.annotate(document=vector, rank=SearchRank(vector, ts_query)).filter(
+            document=ts_query).order_by('-rank', 'id')[offset:offset + limit])
+    condition = Q()
+    for term in terms:
+        condition &= Q(**{f'{lang}__icontains': term}) | Q(original__icontains=term)
+    return list(documents.filter(condition).annotate(rank=Value(0.0)).order_by('-id')[offset:offset + limit])
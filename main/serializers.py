@@ -1,8 +1,16 @@
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from django.contrib.auth import get_user_model
-from moviepy.editor import VideoFileClip
-from rest_framework import serializers
+from django.conf import settings
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework import permissions, serializers
+from .loaders import collect_likeable, comments_prefetch, get_like_loader
+from .media import MediaProbeError, PHOTO_TYPES, VIDEO_TYPES, probe_media
 from .models import *
+from .pagination import KeysetPagination, SubscriptionKeysetPagination
+from .translation import TRANSLATION_LANGUAGES, unused_translation_fields
+from .uploads import UPLOAD_ATTACHED, UPLOAD_COMPLETE
 from PIL import Image
 
 
@@ -30,6 +38,82 @@ class CustomRegisterSerializer(RegisterSerializer):
         user.save(update_fields=['first_name', 'last_name'])
 
 
+class LikesListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        get_like_loader(self.context).load(collect_likeable(self.child, items))
+        return super().to_representation(items)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Renders stored rendition names as a srcset-style {size: {format: url}} map."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        renditions = {}
+        for size, formats in (value or {}).items():
+            renditions[size] = {}
+            for image_format, name in formats.items():
+                url = default_storage.url(name)
+                renditions[size][image_format] = request.build_absolute_uri(url) if request else url
+        return renditions
+
+
+def projection_language(context):
+    """The ``lang`` URL kwarg a read should be projected to, or None when every translation is wanted."""
+    request = context.get('request')
+    lang = getattr(context.get('view'), 'kwargs', {}).get('lang')
+    if lang not in TRANSLATION_LANGUAGES or request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    if request.query_params.get('all_langs') in ('1', 'true'):
+        return None
+    return lang
+
+
+class TranslatedField(serializers.Field):
+    """A translatable field in one language, falling back to the original text while the translation is missing."""
+
+    def __init__(self, lang, **kwargs):
+        self.lang = lang
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, obj):
+        return getattr(obj, f'{self.field_name}_{self.lang}') or getattr(obj, self.field_name)
+
+
+class LanguageProjectionMixin:
+    """On reads under ``/<lang>/`` emit a single ``title``/``body`` instead of every ``*_<lang>`` column."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        lang = projection_language(self.context)
+        if lang:
+            for field in self.Meta.model.translatable_fields:
+                for language in TRANSLATION_LANGUAGES:
+                    fields.pop(f'{field}_{language}', None)
+                if field in fields:
+                    fields[field] = TranslatedField(lang)
+        return fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'sha256', 'chunk_size', 'received', 'chunks', 'status', 'name',
+                  'media_kind', 'media_container', 'media_codec', 'create_time']
+        read_only_fields = ['received', 'chunks', 'status', 'name', 'media_kind', 'media_container', 'media_codec']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Размер файла должен быть от 1 до {settings.UPLOAD_MAX_SIZE} байт.")
+        return value
+
+
 class UserNestedSerializer(serializers.ModelSerializer):
     date_joined = serializers.SerializerMethodField()
 
@@ -43,10 +127,32 @@ class UserNestedSerializer(serializers.ModelSerializer):
 
 class OwnerSerializer(serializers.ModelSerializer):
     user = UserNestedSerializer()
+    avatar_renditions = RenditionsField()
+    banner_renditions = RenditionsField()
 
     class Meta:
         model = UserProfile
-        fields = ['id', 'user', 'avatar', 'banner']
+        fields = ['id', 'user', 'avatar', 'banner', 'avatar_renditions', 'banner_renditions']
+
+
+CONTENT_MODELS = {'news': News, 'posts': Posts, 'stories': Stories, 'comments': Comment}
+
+
+class LikeTargetSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=list(CONTENT_MODELS))
+    id = serializers.IntegerField(min_value=1)
+
+
+class LikeActionSerializer(LikeTargetSerializer):
+    action = serializers.ChoiceField(choices=['like', 'unlike'])
+
+
+class LikeStateRequestSerializer(serializers.Serializer):
+    items = LikeTargetSerializer(many=True, allow_empty=False, max_length=settings.LIKE_BATCH_MAX_ITEMS)
+
+
+class LikeBatchRequestSerializer(serializers.Serializer):
+    actions = LikeActionSerializer(many=True, allow_empty=False, max_length=settings.LIKE_BATCH_MAX_ITEMS)
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -57,6 +163,11 @@ class LikeSerializer(serializers.ModelSerializer):
         model = Like
         fields = ['id', 'create_time', 'owner', 'object_id', 'content_type']
 
+    def validate_content_type(self, content_type):
+        if content_type.model_class() not in CONTENT_MODELS.values():
+            raise serializers.ValidationError("Лайкнуть можно только новость, пост, историю или комментарий.")
+        return content_type
+
     def get_create_time(self, obj):
         return obj.create_time.strftime("%d-%m-%Y %H:%M:%S")
 
@@ -83,27 +194,22 @@ class UsersLikeSerializer(LikeSerializer):
             return SimpleCommentSerializer(obj.content_object).data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(LanguageProjectionMixin, serializers.ModelSerializer):
     create_time = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
     likes = serializers.SerializerMethodField()
     owner = OwnerSerializer(read_only=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'body', 'body_en', 'body_ru', 'body_uz', 'owner', 'create_time', 'likes_count', 'likes']
+        fields = ['id', 'body', 'body_en', 'body_ru', 'body_uz', 'translation_status', 'owner', 'create_time',
+                  'likes_count', 'likes']
+        list_serializer_class = LikesListSerializer
 
     def get_create_time(self, obj):
         return obj.create_time.strftime("%d-%m-%Y %H:%M:%S")
 
-    def get_likes_count(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        return Like.objects.filter(content_type=content_type, object_id=obj.id).count()
-
     def get_likes(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        likes = Like.objects.filter(content_type=content_type, object_id=obj.id)
-        return LikeSerializer(likes, many=True).data
+        return LikeSerializer(get_like_loader(self.context).get(obj), many=True).data
 
 
 class SimpleCommentSerializer(CommentSerializer):
@@ -112,201 +218,368 @@ class SimpleCommentSerializer(CommentSerializer):
         fields = ['id', 'body', 'body_en', 'body_ru', 'body_uz', 'owner', 'create_time']
 
 
-class NewsSerializer(serializers.ModelSerializer):
-    create_time = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
-    likes = serializers.SerializerMethodField()
+class CommentPreviewSerializer(CommentSerializer):
+    """A comment as shown under a post or story in lists: counts only, the likes themselves stay on the comment."""
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'body', 'body_en', 'body_ru', 'body_uz', 'owner', 'create_time', 'likes_count']
+
+
+class MediaValidationMixin:
+    """Checks uploads from their headers; decoding, duration and poster frames are left to the media worker."""
 
     def validate_src(self, value):
-        if self.initial_data['type'] == 'Видео' or self.initial_data['type'] == 'Video':
-            try:
-                clip = VideoFileClip(value.temporary_file_path())
-            except IOError:
+        media_type = self.initial_data.get('type', getattr(self.instance, 'type', None))
+        try:
+            self.probe = probe_media(value)
+        except MediaProbeError:
+            self.probe = None
+        if media_type in VIDEO_TYPES:
+            if self.probe is None or self.probe['kind'] != 'video':
                 raise serializers.ValidationError("Файл должен быть видео")
-        elif (self.initial_data['type'] == 'Фото' or self.initial_data['type'] == 'Photo' or
-              self.initial_data['type'] == 'Foto'):
-            if not value.content_type.startswith('image/'):
+        elif media_type in PHOTO_TYPES:
+            if not value.content_type.startswith('image/') or self.probe is not None and self.probe['kind'] != 'image':
                 raise serializers.ValidationError("Файл должен быть изображением")
-            else:
+            if self.probe is None:
                 try:
-                    Image.open(value)
+                    with Image.open(value) as image:
+                        self.probe = {'kind': 'image', 'container': image.format.lower(), 'codec': image.format.lower()}
                 except IOError:
                     raise serializers.ValidationError("Невозможно открыть файл как изображение")
+                finally:
+                    value.seek(0)
         return value
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        upload = attrs.pop('upload', None)
+        if upload is not None:
+            attrs.update(self.attach_upload(upload, attrs.get('type', getattr(self.instance, 'type', None))))
+            return attrs
+        if 'src' not in attrs and self.instance is None:
+            raise serializers.ValidationError({'src': "Нужен файл или id завершённой загрузки (upload)."})
+        probe = getattr(self, 'probe', None)
+        if 'src' in attrs and probe is not None:
+            attrs['media_container'] = probe['container']
+            attrs['media_codec'] = probe['codec']
+        return attrs
+
+    def attach_upload(self, upload, media_type):
+        request = self.context.get('request')
+        if request is None or upload.owner.user_id != request.user.id:
+            raise serializers.ValidationError({'upload': "Это не ваша загрузка."})
+        if media_type in VIDEO_TYPES and upload.media_kind != 'video':
+            raise serializers.ValidationError({'upload': "Файл должен быть видео"})
+        if media_type in PHOTO_TYPES and upload.media_kind != 'image':
+            raise serializers.ValidationError({'upload': "Файл должен быть изображением"})
+        self.attached_upload = upload
+        return {'src': upload.name, 'media_container': upload.media_container, 'media_codec': upload.media_codec}
+
+    def mark_upload_attached(self):
+        upload = getattr(self, 'attached_upload', None)
+        if upload is not None:
+            UploadSession.objects.filter(pk=upload.pk).update(status=UPLOAD_ATTACHED)
+
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        self.mark_upload_attached()
+        return instance
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        self.mark_upload_attached()
+        return instance
+
+
+class NewsSerializer(LanguageProjectionMixin, MediaValidationMixin, serializers.ModelSerializer):
+    src_renditions = RenditionsField()
+    upload = serializers.PrimaryKeyRelatedField(queryset=UploadSession.objects.filter(status=UPLOAD_COMPLETE),
+                                                write_only=True, required=False)
+    create_time = serializers.SerializerMethodField()
+    likes = serializers.SerializerMethodField()
+
     class Meta:
         model = News
         fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'body', 'body_en', 'body_ru',
-                  'body_uz', 'comments', 'create_time', 'likes_count', 'likes']
+                  'body_uz', 'translation_status', 'media_status', 'media_container', 'media_codec', 'width', 'height',
+                  'duration', 'poster', 'src_renditions', 'upload', 'create_time', 'likes_count', 'likes']
+        extra_kwargs = {'src': {'required': False}}
+        list_serializer_class = LikesListSerializer
 
     def get_create_time(self, obj):
         return obj.create_time.strftime("%d-%m-%Y %H:%M:%S")
 
-    def get_likes_count(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        return Like.objects.filter(content_type=content_type, object_id=obj.id).count()
-
     def get_likes(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        likes = Like.objects.filter(content_type=content_type, object_id=obj.id)
-        return LikeSerializer(likes, many=True).data
+        return LikeSerializer(get_like_loader(self.context).get(obj), many=True).data
 
 
 class SimpleNewsSerializer(NewsSerializer):
     class Meta:
         model = News
         fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'body', 'body_en', 'body_ru',
-                  'body_uz', 'comments', 'create_time']
+                  'body_uz', 'create_time']
 
 
-class PostsSerializer(serializers.ModelSerializer):
+class PostsSerializer(LanguageProjectionMixin, MediaValidationMixin, serializers.ModelSerializer):
+    src_renditions = RenditionsField()
+    upload = serializers.PrimaryKeyRelatedField(queryset=UploadSession.objects.filter(status=UPLOAD_COMPLETE),
+                                                write_only=True, required=False)
     create_time = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments_preview = CommentPreviewSerializer(many=True, read_only=True)
     likes = serializers.SerializerMethodField()
     owner = OwnerSerializer(read_only=True)
 
-    def validate_src(self, value):
-        if self.initial_data['type'] == 'Видео' or self.initial_data['type'] == 'Video':
-            try:
-                clip = VideoFileClip(value.temporary_file_path())
-            except IOError:
-                raise serializers.ValidationError("Файл должен быть видео")
-        elif (self.initial_data['type'] == 'Фото' or self.initial_data['type'] == 'Photo' or
-              self.initial_data['type'] == 'Foto'):
-            if not value.content_type.startswith('image/'):
-                raise serializers.ValidationError("Файл должен быть изображением")
-            else:
-                try:
-                    Image.open(value)
-                except IOError:
-                    raise serializers.ValidationError("Невозможно открыть файл как изображение")
-        return value
-
     class Meta:
         model = Posts
         fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'body', 'body_en', 'body_ru',
-                  'body_uz', 'comments', 'create_time', 'owner', 'likes_count', 'likes']
+                  'body_uz', 'translation_status', 'media_status', 'media_container', 'media_codec', 'width', 'height',
+                  'duration', 'poster', 'src_renditions', 'upload', 'comments_count', 'comments_preview', 'create_time',
+                  'owner', 'likes_count', 'likes']
+        extra_kwargs = {'src': {'required': False}}
+        list_serializer_class = LikesListSerializer
 
     def get_create_time(self, obj):
         return obj.create_time.strftime("%d-%m-%Y %H:%M:%S")
 
-    def get_likes_count(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        return Like.objects.filter(content_type=content_type, object_id=obj.id).count()
-
     def get_likes(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        likes = Like.objects.filter(content_type=content_type, object_id=obj.id)
-        return LikeSerializer(likes, many=True).data
+        return LikeSerializer(get_like_loader(self.context).get(obj), many=True).data
 
 
 class SimplePostsSerializer(PostsSerializer):
     class Meta:
         model = Posts
         fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'body', 'body_en', 'body_ru',
-                  'body_uz', 'comments', 'create_time', 'owner']
+                  'body_uz', 'comments_count', 'create_time', 'owner']
 
 
-class StoriesSerializer(serializers.ModelSerializer):
+class StoriesSerializer(LanguageProjectionMixin, MediaValidationMixin, serializers.ModelSerializer):
+    src_renditions = RenditionsField()
+    upload = serializers.PrimaryKeyRelatedField(queryset=UploadSession.objects.filter(status=UPLOAD_COMPLETE),
+                                                write_only=True, required=False)
     create_time = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
+    comments_preview = CommentPreviewSerializer(many=True, read_only=True)
     owner = OwnerSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
     likes = serializers.SerializerMethodField()
 
-    def validate_src(self, value):
-        if self.initial_data['type'] == 'Видео' or self.initial_data['type'] == 'Video':
-            try:
-                clip = VideoFileClip(value.temporary_file_path())
-            except IOError:
-                raise serializers.ValidationError("Файл должен быть видео")
-        elif (self.initial_data['type'] == 'Фото' or self.initial_data['type'] == 'Photo' or
-              self.initial_data['type'] == 'Foto'):
-            if not value.content_type.startswith('image/'):
-                raise serializers.ValidationError("Файл должен быть изображением")
-            else:
-                try:
-                    Image.open(value)
-                except IOError:
-                    raise serializers.ValidationError("Невозможно открыть файл как изображение")
-        return value
-
     class Meta:
         model = Stories
-        fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'comments', 'create_time', 'owner',
-                  'likes_count', 'likes']
+        fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'translation_status',
+                  'media_status', 'media_container', 'media_codec', 'width', 'height', 'duration', 'poster',
+                  'src_renditions', 'upload', 'comments_count', 'comments_preview', 'create_time', 'expire_time',
+                  'owner', 'likes_count', 'likes']
+        extra_kwargs = {'src': {'required': False}, 'expire_time': {'read_only': True}}
+        list_serializer_class = LikesListSerializer
 
     def get_create_time(self, obj):
         return obj.create_time.strftime("%d-%m-%Y %H:%M:%S")
 
-    def get_likes_count(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        return Like.objects.filter(content_type=content_type, object_id=obj.id).count()
-
     def get_likes(self, obj):
-        content_type = ContentType.objects.get_for_model(obj)
-        likes = Like.objects.filter(content_type=content_type, object_id=obj.id)
-        return LikeSerializer(likes, many=True).data
+        return LikeSerializer(get_like_loader(self.context).get(obj), many=True).data
+
+
+class StoryTraySerializer(OwnerSerializer):
+    """An owner with their active stories; StoriesViewSet.list renders the stories in one pass as ``tray``."""
+
+    latest_story = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
+    stories = serializers.SerializerMethodField()
+
+    class Meta(OwnerSerializer.Meta):
+        fields = OwnerSerializer.Meta.fields + ['latest_story', 'stories']
+
+    def get_stories(self, obj):
+        return obj.tray
 
 
 class SimpleStoriesSerializer(StoriesSerializer):
     class Meta:
         model = Stories
-        fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'comments', 'create_time', 'owner']
+        fields = ['id', 'type', 'src', 'title', 'title_en', 'title_ru', 'title_uz', 'comments_count', 'create_time',
+                  'owner']
 
 
-class UserSubscriptionSerializer(OwnerSerializer):
-    subscriber_subscribed_date = serializers.SerializerMethodField()
-    subscribed_date = serializers.SerializerMethodField()
+class SubscriptionProfileSerializer(serializers.ModelSerializer):
+    """Renders a Subscription row as the profile on ``profile_field`` plus the subscription dates."""
 
-    class Meta(OwnerSerializer.Meta):
-        fields = OwnerSerializer.Meta.fields + ['subscriber_subscribed_date', 'subscribed_date']
+    profile_field = 'subscriber'
+    subscriber_subscribed_date = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
+    subscribed_date = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
+
+    class Meta:
+        model = Subscription
+        fields = ['subscriber_subscribed_date', 'subscribed_date']
+
+    def to_representation(self, instance):
+        data = OwnerSerializer(getattr(instance, self.profile_field), context=self.context).data
+        data.update(super().to_representation(instance))
+        return data
+
+
+class SubscribedToProfileSerializer(SubscriptionProfileSerializer):
+    profile_field = 'subscribed_to'
+
+
+class ContentListSerializer(serializers.ListSerializer):
+    """Renders rows pointing at content by (content_type, object_id), loading each content model in one query."""
+
+    content_serializers = [(Posts, PostsSerializer), (Stories, StoriesSerializer)]
+    # Keys each entry carries besides its content's ``type`` and the rendered ``content``: {key: f(entry, content)}.
+    entry_fields = {}
+
+    def content_queryset(self, model, lang):
+        queryset = model.objects.active() if model is Stories else model.objects.all()
+        if lang:
+            queryset = queryset.defer(*unused_translation_fields(model, lang))
+        if model in (Posts, Stories):
+            queryset = queryset.select_related('owner__user').prefetch_related(comments_prefetch(lang))
+        elif model is Comment:
+            queryset = queryset.select_related('owner__user')
+        return queryset
+
+    def to_representation(self, data):
+        entries = list(data)
+        lang = projection_language(self.context)
+        rendered = {}
+        for model, serializer_class in self.content_serializers:
+            content_type = ContentType.objects.get_for_model(model)
+            ids = [entry.object_id for entry in entries if entry.content_type_id == content_type.id]
+            if not ids:
+                continue
+            objects = list(self.content_queryset(model, lang).filter(id__in=ids))
+            items = serializer_class(objects, many=True, context=self.context).data
+            for obj, item in zip(objects, items):
+                rendered[(content_type.id, obj.pk)] = (content_type.model, item)
+        return [self.entry_representation(entry, *rendered[(entry.content_type_id, entry.object_id)])
+                for entry in entries if (entry.content_type_id, entry.object_id) in rendered]
+
+    def entry_representation(self, entry, content_type, item):
+        fields = {key: value(entry, item) for key, value in self.entry_fields.items()}
+        return {'type': content_type, **fields, 'content': item}
+
+
+class TimelineListSerializer(ContentListSerializer):
+    entry_fields = {'id': lambda entry, item: entry.id, 'create_time': lambda entry, item: item['create_time']}
+
+
+class TimelineEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TimelineEntry
+        fields = ['id', 'content_type', 'object_id', 'create_time']
+        list_serializer_class = TimelineListSerializer
+
+
+class SearchResultListSerializer(ContentListSerializer):
+    content_serializers = [(News, NewsSerializer), (Posts, PostsSerializer), (Stories, StoriesSerializer),
+                           (Comment, CommentSerializer)]
+    entry_fields = {'rank': lambda entry, item: round(entry.rank, 4)}
 
-    def get_subscriber_subscribed_date(self, obj):
-        subscription = Subscription.objects.get(subscriber=obj, subscribed_to=self.context['userprofile'])
-        return subscription.subscriber_subscribed_date.strftime("%d-%m-%Y %H:%M:%S")
 
-    def get_subscribed_date(self, obj):
-        subscription = Subscription.objects.get(subscriber=self.context['userprofile'], subscribed_to=obj)
-        return subscription.subscribed_date.strftime("%d-%m-%Y %H:%M:%S")
+class SearchResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SearchDocument
+        fields = ['content_type', 'object_id']
+        list_serializer_class = SearchResultListSerializer
+
+
+def query_list(context, param):
+    request = context.get('request')
+    if request is None or param not in request.query_params:
+        return None
+    return [name.strip() for name in request.query_params[param].split(',') if name.strip()]
+
+
+def user_collection(name, userprofile):
+    """Return the queryset, serializer and paginator for one of a user's collections."""
+    if name == 'stories':
+        queryset = Stories.objects.active().filter(owner=userprofile).select_related('owner__user').prefetch_related(
+            comments_prefetch())
+        return queryset, StoriesSerializer, KeysetPagination
+    if name == 'posts':
+        queryset = Posts.objects.filter(owner=userprofile).select_related('owner__user').prefetch_related(
+            comments_prefetch())
+        return queryset, PostsSerializer, KeysetPagination
+    if name == 'comments':
+        queryset = Comment.objects.filter(owner=userprofile).select_related('owner__user')
+        return queryset, CommentSerializer, KeysetPagination
+    if name == 'likes':
+        queryset = Like.objects.filter(owner=userprofile).select_related('owner__user').prefetch_related(
+            GenericPrefetch('content_object', [News.objects.all(), Posts.objects.select_related('owner__user'),
+                                               Stories.objects.select_related('owner__user'),
+                                               Comment.objects.select_related('owner__user')]))
+        return queryset, UsersLikeSerializer, KeysetPagination
+    if name == 'subscribers':
+        queryset = Subscription.objects.filter(subscribed_to=userprofile).select_related('subscriber__user')
+        return queryset, SubscriptionProfileSerializer, SubscriptionKeysetPagination
+    if name == 'subscriptions':
+        queryset = Subscription.objects.filter(subscriber=userprofile).select_related('subscribed_to__user')
+        return queryset, SubscribedToProfileSerializer, SubscriptionKeysetPagination
+    raise KeyError(name)
+
+
+class ExpandedCollectionField(serializers.Field):
+    """First page of one of a user's collections, with a next link to its paginated endpoint."""
+
+    def __init__(self, collection, **kwargs):
+        self.collection = collection
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, obj):
+        queryset, serializer_class, pagination_class = user_collection(self.collection, obj)
+        paginator = pagination_class()
+        url = reverse(f'users-{self.collection}', kwargs={'pk': obj.pk})
+        page = paginator.first_page(queryset, self.context['request'], url)
+        return paginator.get_paginated_data(serializer_class(page, many=True, context=self.context).data)
+
+
+class SparseFieldsMixin:
+    """Keeps only the fields named in ``?fields=`` and adds the collections named in ``?expand=``."""
+
+    expandable_fields = []
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in query_list(self.context, 'expand') or []:
+            if name in self.expandable_fields:
+                fields[name] = ExpandedCollectionField(name)
+        requested = query_list(self.context, 'fields')
+        if requested is not None:
+            expanded = query_list(self.context, 'expand') or []
+            fields = {name: field for name, field in fields.items() if name in requested or name in expanded}
+        return fields
+
+
+class UserProfileSummarySerializer(SparseFieldsMixin, OwnerSerializer):
+    expandable_fields = ['stories', 'posts', 'comments', 'likes', 'subscribers', 'subscriptions']
+    posts_count = serializers.IntegerField(read_only=True)
+    stories_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    subscribers_count = serializers.IntegerField(read_only=True)
+    subscribes_count = serializers.IntegerField(read_only=True)
+
+    class Meta(OwnerSerializer.Meta):
+        fields = OwnerSerializer.Meta.fields + ['posts_count', 'stories_count', 'comments_count', 'likes_count',
+                                                'subscribers_count', 'subscribes_count']
 
 
 class UserSerializer(OwnerSerializer):
-    stories = StoriesSerializer(many=True, read_only=True)
-    posts = PostsSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
-    likes = serializers.SerializerMethodField()
-    subscribers = serializers.SerializerMethodField()
+    stories = ExpandedCollectionField('stories')
+    posts = ExpandedCollectionField('posts')
+    comments = ExpandedCollectionField('comments')
+    likes = ExpandedCollectionField('likes')
+    subscribers = ExpandedCollectionField('subscribers')
     subscribers_count = serializers.SerializerMethodField()
-    subscribes = serializers.SerializerMethodField()
+    subscribes = ExpandedCollectionField('subscriptions')
     subscribes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
-        fields = ['id', 'user', 'avatar', 'banner', 'stories', 'posts', 'comments', 'likes', 'subscribers',
-                  'subscribers_count', 'subscribes', 'subscribes_count']
-
-    def get_likes(self, obj):
-        likes = Like.objects.filter(owner=obj)
-        return UsersLikeSerializer(likes, many=True).data
-
-    def get_subscribers(self, obj):
-        subscribers = obj.subscribers.all()
-        context = self.context
-        context['userprofile'] = obj
-        return UserSubscriptionSerializer(subscribers, many=True, context=context).data
+        fields = ['id', 'user', 'avatar', 'banner', 'avatar_renditions', 'banner_renditions', 'stories', 'posts',
+                  'comments', 'likes', 'subscribers', 'subscribers_count', 'subscribes', 'subscribes_count']
 
     def get_subscribers_count(self, obj):
         return obj.subscribers.count()
 
-    def get_subscribes(self, obj):
-        subscribes = obj.subscribes.all()
-        context = self.context
-        context['userprofile'] = obj
-        return UserSubscriptionSerializer(subscribes, many=True, context=context).data
-
     def get_subscribes_count(self, obj):
         return obj.subscribes.count()
 
@@ -0,0 +1,49 @@
+import functools
+import itertools
+import random
+import threading
+import time
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+LOCK_ERRORS = ('database is locked', 'database table is locked')
+
+write_lock = threading.Lock()
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` hook that applies SQLITE_PRAGMAS to every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        # On the raw connection, so that the pragmas never show up in query logs or counts.
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and str(error).startswith(LOCK_ERRORS)
+
+
+def serialized_write(func):
+    """Run ``func`` as one transaction, one writer at a time per process, retrying it when SQLite reports a lock.
+
+    busy_timeout already waits for the write lock, but SQLite gives up at once when a transaction that has read
+    needs to upgrade to a write while another connection writes; the whole transaction is then retried up to
+    SQLITE_WRITE_RETRIES times with jittered exponential backoff. Inside an outer transaction ``func`` just runs,
+    since only the outer one could be retried.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return func(*args, **kwargs)
+        for attempt in itertools.count():
+            try:
+                with write_lock if settings.SQLITE_SERIALIZE_WRITES else nullcontext(), transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error) or attempt >= settings.SQLITE_WRITE_RETRIES:
+                    raise
+            time.sleep(random.uniform(0, settings.SQLITE_WRITE_RETRY_DELAY * 2 ** attempt))
+    return wrapper
@@ -0,0 +1,79 @@
+import json
+import tempfile
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets ``?format=ndjson`` / ``Accept: application/x-ndjson`` through negotiation; views stream the body."""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class ChunkBuffer:
+    """Joins many small pieces into blocks of about ``STREAM_BLOCK_SIZE`` bytes before they are sent."""
+
+    def __init__(self):
+        self.pieces = []
+        self.size = 0
+
+    def add(self, piece):
+        self.pieces.append(piece)
+        self.size += len(piece)
+        if self.size >= settings.STREAM_BLOCK_SIZE:
+            return self.flush()
+        return None
+
+    def flush(self):
+        block = ''.join(self.pieces).encode('utf-8')
+        self.pieces, self.size = [], 0
+        return block
+
+
+def stream_columns_json(rows, columns):
+    """Stream ``{"<column>s": [...], ..., "count": N}`` from a single pass over ``rows`` of ``len(columns)`` values.
+
+    The first column is sent as rows are read; the others are spooled to temporary files (in memory up to
+    ``STREAM_SPOOL_SIZE``, then on disk) and replayed after it, so memory stays flat however many rows there are.
+    """
+    spools = [tempfile.SpooledTemporaryFile(max_size=settings.STREAM_SPOOL_SIZE) for _ in columns[1:]]
+    try:
+        buffer = ChunkBuffer()
+        count = 0
+        buffer.add(f'{{"{columns[0]}s": [')
+        for row in rows:
+            separator = ', ' if count else ''
+            for spool, value in zip(spools, row[1:]):
+                spool.write((separator + json.dumps(value, ensure_ascii=False)).encode('utf-8'))
+            count += 1
+            block = buffer.add(separator + json.dumps(row[0], ensure_ascii=False))
+            if block:
+                yield block
+        for column, spool in zip(columns[1:], spools):
+            yield buffer.add(f'], "{column}s": [') or buffer.flush()
+            spool.seek(0)
+            while block := spool.read(settings.STREAM_BLOCK_SIZE):
+                yield block
+        buffer.add(f'], "count": {count}}}')
+        yield buffer.flush()
+    finally:
+        for spool in spools:
+            spool.close()
+
+
+def stream_ndjson(rows, columns):
+    """Stream one JSON object per row and a closing ``{"count": N}`` line."""
+    buffer = ChunkBuffer()
+    count = 0
+    for row in rows:
+        count += 1
+        block = buffer.add(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+        if block:
+            yield block
+    buffer.add(json.dumps({'count': count}) + '\n')
+    yield buffer.flush()
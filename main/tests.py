@@ -1,3 +1,1078 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import struct
+from datetime import timedelta
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import JsonResponse
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+from .models import *
+from .timeline import trim_timelines
+from .benchmark import BENCHMARK_COMMENT, compare_reports, default_endpoints, run_benchmark, seed_social_graph
+from .caching import get_stamps, response_cache
+from .jobs import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, claim_jobs, finish_job
+from .loadtest import sync_actions_urlconf
+from .profiling import SlowRequestLog, normalize_sql, slow_requests
+from .replicas import replica_reads, sync_replicas
+from .media import MEDIA_READY, MediaProbeError, probe_media, process_media_jobs
+from .renditions import process_rendition_jobs
+from .search import search
+from .sqlite import serialized_write
+from .stories import purge_expired_stories
+from .uploads import PARTIAL_UPLOAD_DIR, UPLOAD_ATTACHED, collect_abandoned_uploads, partial_path
+from .translation import TRANSLATION_DONE, TRANSLATION_FAILED, TRANSLATION_PENDING, FakeTranslateBackend, \
+    process_translation_jobs, translate_text, translation_cache, translation_cache_stats
 
-# Create your tests here.
+
+class UnavailableTranslateBackend:
+    def translate(self, texts, dest_language):
+        raise ConnectionError('translator unavailable')
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class TranslationQueueTests(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create(username='author').userprofile
+        translation_cache.clear()
+
+    def test_save_defers_translation_to_queue(self):
+        post = Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        post.refresh_from_db()
+        self.assertEqual(post.translation_status, TRANSLATION_PENDING)
+        self.assertEqual(post.title_en, '')
+        self.assertEqual(TranslationJob.objects.filter(object_id=post.id).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TranslationJob.objects.create(content_type=ContentType.objects.get_for_model(Posts), object_id=post.id)
+
+    def test_worker_fills_translations(self):
+        post = Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        comment = Comment.objects.create(body='Зўр', owner=self.profile, post=post)
+        call_command('translation_worker', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(post.translation_status, TRANSLATION_DONE)
+        self.assertEqual(post.title_en, '[en] Салом')
+        self.assertEqual(post.body_uz, '[uz] Дунё')
+        self.assertEqual(comment.body_ru, '[ru] Зўр')
+        self.assertFalse(TranslationJob.objects.exclude(status=JOB_DONE).exists())
+        self.assertEqual(process_translation_jobs(), 0)
+
+    def test_resave_skips_unchanged_fields(self):
+        post = Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        process_translation_jobs()
+        post = Posts.objects.get(pk=post.pk)
+        post.type = 'Видео'
+        post.save()
+        self.assertFalse(TranslationJob.objects.filter(status=JOB_PENDING).exists())
+        post.body = 'Янги'
+        post.save()
+        job = TranslationJob.objects.get(status=JOB_PENDING)
+        self.assertEqual(job.field_list, ['body'])
+        process_translation_jobs()
+        post.refresh_from_db()
+        self.assertEqual((post.title_en, post.body_en), ('[en] Салом', '[en] Янги'))
+
+    def test_concurrent_claims_never_share_a_job(self):
+        Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        raced = []
+
+        def rival_claims_first(execute, sql, params, many, context):
+            # Another worker claims the same rows between this worker's SELECT and its UPDATE.
+            if sql.startswith('UPDATE') and not raced:
+                raced.append(sql)
+                lease = timezone.now() + timedelta(seconds=settings.JOB_CLAIM_TIMEOUT)
+                TranslationJob.objects.update(status=JOB_RUNNING, claim='rival', next_attempt_at=lease)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(rival_claims_first):
+            self.assertEqual(claim_jobs(TranslationJob, 10), [])
+        self.assertEqual(TranslationJob.objects.get().claim, 'rival')
+
+    @override_settings(TRANSLATION_BACKEND='main.tests.UnavailableTranslateBackend', TRANSLATION_MAX_ATTEMPTS=2)
+    def test_failures_back_off_and_can_be_retried(self):
+        post = Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        call_command('translation_worker', '--once', stdout=StringIO())
+        job = TranslationJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (JOB_PENDING, 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertEqual(process_translation_jobs(), 0)
+        with mock.patch('django.utils.timezone.now', return_value=job.next_attempt_at):
+            self.assertEqual(process_translation_jobs(), 1)
+        post.refresh_from_db()
+        self.assertEqual(TranslationJob.objects.get().status, JOB_FAILED)
+        self.assertEqual(post.translation_status, TRANSLATION_FAILED)
+        with override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend'):
+            call_command('translation_worker', '--once', '--retry-failed', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.translation_status, post.title_en), (TRANSLATION_DONE, '[en] Салом'))
+
+    def test_crashed_claims_are_taken_over(self):
+        Posts.objects.create(type='Фото', src='src/a.png', title='Салом', body='Дунё', owner=self.profile)
+        crashed = claim_jobs(TranslationJob, 10)
+        self.assertEqual(claim_jobs(TranslationJob, 10), [])
+        later = timezone.now() + timedelta(seconds=settings.JOB_CLAIM_TIMEOUT + 1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual([job.id for job in claim_jobs(TranslationJob, 10)], [crashed[0].id])
+        finish_job(crashed[0])
+        self.assertEqual(TranslationJob.objects.get().status, JOB_RUNNING)
+
+    def test_translation_memory_serves_repeated_text(self):
+        calls = FakeTranslateBackend.calls
+        self.assertEqual(translate_text('Nice!', 'ru'), '[ru] Nice!')
+        translation_cache.entries.clear()
+        self.assertEqual(translate_text('Nice!', 'ru'), '[ru] Nice!')
+        self.assertEqual(translate_text('Nice!', 'ru'), '[ru] Nice!')
+        self.assertEqual(FakeTranslateBackend.calls, calls + 1)
+        stats = translation_cache_stats()
+        self.assertEqual((stats['misses'], stats['db_hits'], stats['memory_hits']), (1, 1, 1))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class LikeCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='fan')
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='t', body='b',
+                                         owner=User.objects.create(username='author').userprofile)
+        self.client.force_authenticate(self.user)
+
+    def test_like_and_unlike_maintain_counter(self):
+        url = f'/en/posts/{self.post.id}/'
+        self.assertEqual(self.client.post(url + 'like/').json(), {'status': 'Post liked.'})
+        self.assertEqual(self.client.post(url + 'like/').json(), {'status': 'You already liked this post.'})
+        self.assertEqual(self.client.get(url + 'like/').json(), {'likes_count': 1})
+        self.assertEqual(self.client.get(url).data['likes_count'], 1)
+        self.assertEqual(self.client.post(url + 'unlike/').json(), {'status': 'Post unliked.'})
+        self.assertEqual(self.client.get(url + 'unlike/').json(), {'likes_count': 0})
+
+    def test_repeated_like_is_a_single_ignored_insert(self):
+        profile = self.user.userprofile
+        self.assertTrue(Like.objects.add(profile, self.post))
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(Like.objects.add(profile, self.post))
+        statements = [query['sql'].split()[0] for query in context.captured_queries]
+        self.assertEqual([sql for sql in statements if sql not in ('SAVEPOINT', 'RELEASE')], ['INSERT'])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Like.objects.create(owner=profile, content_type=ContentType.objects.get_for_model(Posts),
+                                object_id=self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual((Like.objects.count(), self.post.likes_count), (1, 1))
+        self.assertTrue(Like.objects.remove(profile, self.post))
+        self.assertFalse(Like.objects.remove(profile, self.post))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_only_content_can_be_liked_and_likes_are_not_edited(self):
+        for model in [User, Posts]:
+            content_type = ContentType.objects.get_for_model(model)
+            response = self.client.post('/en/likes/', {'content_type': content_type.pk, 'object_id': self.post.pk})
+            self.assertEqual(response.status_code, 400 if model is User else 201)
+        response = self.client.patch(f'/en/likes/{response.data["id"]}/', {'object_id': self.post.pk + 1})
+        self.assertEqual(response.status_code, 405)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        Like.objects.add(self.user.userprofile, self.post)
+        Posts.objects.filter(pk=self.post.pk).update(likes_count=7)
+        call_command('reconcile_like_counts', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class ListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.profiles = [User.objects.create(username=f'user{i}').userprofile for i in range(5)]
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b',
+                                        owner=self.profiles[i % 5])
+            story = Stories.objects.create(type='Фото', src='src/a.png', title=f's{i}', owner=self.profiles[i % 5])
+            for profile in self.profiles:
+                Like.objects.add(profile, post)
+                Like.objects.add(profile, story)
+                comment = Comment.objects.create(body='c', owner=profile, post=post)
+                Comment.objects.create(body='c', owner=profile, story=story)
+                Like.objects.add(profile, comment)
+
+    def count_queries(self, url):
+        response_cache().clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_list_query_count_is_constant(self):
+        # The stories tray also reads its earliest expiry for the response cache.
+        for url, limit in [('/en/posts/', 4), ('/en/stories/', 5)]:
+            self.add_posts(2)
+            self.count_queries(url)
+            small, _ = self.count_queries(url)
+            self.add_posts(6)
+            large, data = self.count_queries(url)
+            self.assertEqual(small, large)
+            self.assertLessEqual(large, limit)
+            items = data['results']
+            if url == '/en/stories/':
+                items = [story for owner in items for story in owner['stories']]
+            self.assertTrue(all(len(item['likes']) == item['likes_count'] for item in items))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class KeysetPaginationTests(APITestCase):
+    def test_pages_walk_forward_and_back_without_gaps(self):
+        profile = User.objects.create(username='author').userprofile
+        posts = [Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b', owner=profile)
+                 for i in range(7)]
+        Posts.objects.update(create_time=posts[0].create_time)
+        expected = [post.id for post in reversed(posts)]
+        seen = []
+        pages = []
+        url = '/en/posts/?page_size=3'
+        while url:
+            page = self.client.get(url).data
+            pages.append(page)
+            seen += [item['id'] for item in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual([item['id'] for item in previous['results']], expected[3:6])
+        self.assertEqual(self.client.get('/en/posts/?cursor=bogus').status_code, 404)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', API_PAGE_SIZE=2)
+class UserProfileListTests(APITestCase):
+    def setUp(self):
+        self.profile = User.objects.create(username='author').userprofile
+        self.posts = [Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b', owner=self.profile)
+                      for i in range(3)]
+        Like.objects.add(self.profile, self.posts[0])
+
+    def test_list_is_compact(self):
+        data = self.client.get('/users/').data['results'][0]
+        self.assertNotIn('posts', data)
+        self.assertEqual((data['posts_count'], data['likes_count'], data['subscribers_count']), (3, 1, 0))
+
+    def test_sparse_fields_and_expansion(self):
+        data = self.client.get(f'/users/{self.profile.id}/?fields=id,posts_count&expand=posts').data
+        self.assertEqual(set(data), {'id', 'posts_count', 'posts'})
+        self.assertEqual([post['id'] for post in data['posts']['results']], [self.posts[2].id, self.posts[1].id])
+        rest = self.client.get(data['posts']['next']).data
+        self.assertEqual([post['id'] for post in rest['results']], [self.posts[0].id])
+
+
+    @override_settings(API_PAGE_SIZE=10)
+    def test_detail_pages_collections_in_constant_queries(self):
+        fan = User.objects.create(username='fan').userprofile
+
+        def like_one_of_each():
+            post = Posts.objects.create(type='Фото', src='src/a.png', title='p', body='b', owner=fan)
+            for obj in [News.objects.create(type='Фото', src='src/n.png', title='n', body='b'), post,
+                        Stories.objects.create(type='Фото', src='src/s.png', title='s', owner=fan),
+                        Comment.objects.create(body='c', owner=fan, post=post)]:
+                Like.objects.add(self.profile, obj)
+            Comment.objects.create(body='c', owner=self.profile, post=post)
+
+        def detail():
+            with CaptureQueriesContext(connection) as context:
+                data = self.client.get(f'/users/{self.profile.id}/').data
+            return len(context.captured_queries), data
+
+        like_one_of_each()
+        few, _ = detail()
+        for _ in range(5):
+            like_one_of_each()
+        many, data = detail()
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['likes']['results']), 10)
+        self.assertEqual({like['content_object_type'] for like in data['likes']['results']},
+                         {'News', 'Posts', 'Stories', 'Comment'})
+        self.assertIsNotNone(data['likes']['next'])
+        self.assertEqual(len(data['comments']['results']), 6)
+
+class SubscriptionListTests(APITestCase):
+    def test_subscribers_and_subscriptions_use_the_through_table(self):
+        star = User.objects.create(username='star').userprofile
+        fans = [User.objects.create(username=f'fan{i}').userprofile for i in range(4)]
+        for fan in fans:
+            Subscription.objects.create(subscriber=fan, subscribed_to=star)
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get(f'/users/{star.id}/subscribers/').data
+        self.assertEqual([item['id'] for item in data['results']], [fan.id for fan in reversed(fans)])
+        self.assertIn('subscribed_date', data['results'][0])
+        self.assertLessEqual(len(context.captured_queries), 2)
+        data = self.client.get(f'/users/{fans[0].id}/subscriptions/').data
+        self.assertEqual([item['user']['username'] for item in data['results']], ['star'])
+        data = self.client.get(f'/users/{star.id}/').data
+        self.assertEqual((data['subscribers_count'], len(data['subscribers']['results'])), (4, 4))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', FEED_FANOUT_LIMIT=2)
+class HomeTimelineTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create(username='reader')
+        self.profile = self.reader.userprofile
+        self.client.force_authenticate(self.reader)
+
+    def publish(self, author, title):
+        return Posts.objects.create(type='Фото', src='src/a.png', title=title, body='b', owner=author)
+
+    def feed_titles(self):
+        return [item['content']['title'] for item in self.client.get('/en/feed/').data['results']]
+
+    def test_feed_contains_followed_content(self):
+        friend = User.objects.create(username='friend').userprofile
+        stranger = User.objects.create(username='stranger').userprofile
+        old = self.publish(friend, 'old')
+        Subscription.objects.create(subscriber=self.profile, subscribed_to=friend)
+        self.publish(friend, 'new')
+        self.publish(stranger, 'hidden')
+        Stories.objects.create(type='Фото', src='src/a.png', title='story', owner=friend)
+        self.assertEqual(self.feed_titles(), ['story', 'new', 'old'])
+        old.delete()
+        self.assertEqual(self.feed_titles(), ['story', 'new'])
+        Subscription.objects.filter(subscriber=self.profile).delete()
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_high_follower_accounts_are_pulled_on_read(self):
+        star = User.objects.create(username='star').userprofile
+        for i in range(3):
+            Subscription.objects.create(subscriber=User.objects.create(username=f'fan{i}').userprofile,
+                                        subscribed_to=star)
+        Subscription.objects.create(subscriber=self.profile, subscribed_to=star)
+        self.publish(star, 'hit')
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.profile).count(), 0)
+        self.assertEqual(self.feed_titles(), ['hit'])
+
+    def test_trim_keeps_newest_entries(self):
+        for i in range(5):
+            self.publish(self.profile, f'p{i}')
+        self.assertEqual(trim_timelines(max_entries=2), 3)
+        self.assertEqual(self.feed_titles(), ['p4', 'p3'])
+
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def fake_mp4(codec=b'avc1'):
+    stsd = box(b'stsd', b'\0\0\0\0' + struct.pack('>I', 1) + box(codec, b'\0' * 8))
+    return box(b'ftyp', b'isom\0\0\0\0') + box(b'mdat', b'\0' * 4096) + box(b'moov', box(b'trak', stsd))
+
+
+def png_bytes(size=(40, 30)):
+    output = BytesIO()
+    Image.new('RGB', size, 'red').save(output, format='PNG')
+    return output.getvalue()
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', MEDIA_ROOT=tempfile.mkdtemp())
+class MediaProbeTests(APITestCase):
+    def test_probe_reads_container_and_codec_from_headers(self):
+        self.assertEqual(probe_media(BytesIO(fake_mp4(b'hvc1'))),
+                         {'kind': 'video', 'container': 'mp4', 'codec': 'hevc'})
+        self.assertEqual(probe_media(BytesIO(png_bytes()))['container'], 'png')
+        with self.assertRaises(MediaProbeError):
+            probe_media(BytesIO(fake_mp4(b'mp4a')))
+        with self.assertRaises(MediaProbeError):
+            probe_media(BytesIO(b'not a video at all'))
+
+    def test_upload_is_probed_and_analysed_in_background(self):
+        user = User.objects.create(username='author')
+        self.client.force_authenticate(user)
+        video = SimpleUploadedFile('clip.mp4', fake_mp4(), content_type='video/mp4')
+        response = self.client.post('/en/posts/', {'type': 'Видео', 'title': 't', 'body': 'b', 'src': video})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['media_container'], response.data['media_codec']), ('mp4', 'h264'))
+        bad = SimpleUploadedFile('clip.mp4', b'garbage' * 100, content_type='video/mp4')
+        response = self.client.post('/en/posts/', {'type': 'Видео', 'title': 't', 'body': 'b', 'src': bad})
+        self.assertEqual(response.status_code, 400)
+        photo = SimpleUploadedFile('a.png', png_bytes(), content_type='image/png')
+        response = self.client.post('/en/posts/', {'type': 'Фото', 'title': 't', 'body': 'b', 'src': photo})
+        self.assertEqual(response.status_code, 201, response.data)
+        disguised = SimpleUploadedFile('a.png', fake_mp4(), content_type='image/png')
+        self.assertEqual(self.client.post('/en/posts/', {'type': 'Фото', 'title': 't', 'body': 'b',
+                                                         'src': disguised}).status_code, 400)
+        disguised.seek(0)
+        self.assertEqual(self.client.patch(f'/en/posts/{response.data["id"]}/', {'src': disguised}).status_code, 400)
+        MediaJob.objects.exclude(object_id=response.data['id']).delete()
+        process_media_jobs()
+        post = Posts.objects.get(pk=response.data['id'])
+        self.assertEqual((post.media_status, post.width, post.height), (MEDIA_READY, 40, 30))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', MEDIA_ROOT=tempfile.mkdtemp(),
+                   RENDITION_SIZES=[64, 256, 1080])
+class RenditionTests(APITestCase):
+    def test_avatar_and_photo_renditions(self):
+        user = User.objects.create(username='author')
+        self.client.force_authenticate(user)
+        profile = user.userprofile
+        profile.avatar = SimpleUploadedFile('me.png', png_bytes((300, 200)), content_type='image/png')
+        profile.save()
+        photo = SimpleUploadedFile('a.png', png_bytes((100, 50)), content_type='image/png')
+        post_id = self.client.post('/en/posts/', {'type': 'Фото', 'title': 't', 'body': 'b', 'src': photo}).data['id']
+        self.assertEqual(RenditionJob.objects.count(), 2)
+        process_rendition_jobs()
+        profile.refresh_from_db()
+        self.assertEqual(sorted(profile.avatar_renditions, key=int), ['64', '256'])
+        with Image.open(os.path.join(settings.MEDIA_ROOT, profile.avatar_renditions['64']['webp'])) as image:
+            self.assertEqual(image.size, (64, 43))
+        data = self.client.get(f'/en/posts/{post_id}/').data
+        self.assertEqual(list(data['src_renditions']), ['64'])
+        self.assertEqual(data['src_renditions']['64']['jpeg'],
+                         f'http://testserver/media/renditions/posts/{post_id}/src/a_64.jpg')
+        self.assertEqual(list(data['owner']['avatar_renditions']['256']), ['webp', 'jpeg'])
+        profile.save()
+        self.assertEqual(RenditionJob.objects.filter(status=JOB_PENDING).count(), 0)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', MEDIA_ROOT=tempfile.mkdtemp(),
+                   UPLOAD_CHUNK_SIZE=2048)
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='author')
+        self.client.force_authenticate(self.user)
+
+    def put_chunk(self, session_id, index, data, checksum=None):
+        return self.client.put(f'/uploads/{session_id}/chunks/{index}/', data=data,
+                               content_type='application/octet-stream',
+                               HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(data).hexdigest())
+
+    def test_resumable_upload_attached_to_post(self):
+        video = fake_mp4()
+        chunks = [video[i:i + 2048] for i in range(0, len(video), 2048)]
+        session = self.client.post('/uploads/', {'filename': 'clip.mp4', 'size': len(video),
+                                                 'sha256': hashlib.sha256(video).hexdigest()}).data
+        self.assertEqual(self.put_chunk(session['id'], 0, chunks[0], checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.put_chunk(session['id'], 0, chunks[0]).data['received'], 2048)
+        self.assertEqual(self.put_chunk(session['id'], 0, chunks[0]).data['chunks'], 1)
+        self.assertEqual(self.put_chunk(session['id'], 2, chunks[2]).status_code, 409)
+        self.assertEqual(self.client.post(f'/uploads/{session["id"]}/finalize/').status_code, 409)
+        for index in range(1, len(chunks)):
+            self.assertEqual(self.put_chunk(session['id'], index, chunks[index]).status_code, 200)
+        data = self.client.post(f'/uploads/{session["id"]}/finalize/').data
+        self.assertEqual((data['status'], data['media_kind'], data['media_codec']), ('complete', 'video', 'h264'))
+        response = self.client.post('/en/posts/', {'type': 'Видео', 'title': 't', 'body': 'b', 'upload': session['id']})
+        self.assertEqual(response.status_code, 201, response.data)
+        post = Posts.objects.get(pk=response.data['id'])
+        self.assertEqual(post.src.name, data['name'])
+        with post.src.open('rb') as src:
+            self.assertEqual(src.read(), video)
+        self.assertEqual(UploadSession.objects.get(pk=session['id']).status, UPLOAD_ATTACHED)
+
+    def test_abandoned_sessions_are_collected(self):
+        session = self.client.post('/uploads/', {'filename': 'clip.mp4', 'size': 5000}).data
+        self.put_chunk(session['id'], 0, b'x' * 100)
+        session = UploadSession.objects.get(pk=session['id'])
+        self.assertTrue(os.path.exists(partial_path(session)))
+        UploadSession.objects.update(update_time=session.update_time - timedelta(days=2))
+        self.assertEqual(collect_abandoned_uploads(), 1)
+        self.assertFalse(os.path.exists(partial_path(session)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * 4
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'src'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'src', 'clip.mp4'), 'wb') as file:
+            file.write(self.data)
+
+    def get(self, **headers):
+        return self.client.get('/media/src/clip.mp4', **headers)
+
+    def test_full_and_ranged_responses(self):
+        response = self.get()
+        self.assertEqual((response.status_code, response['Accept-Ranges']), (200, 'bytes'))
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 10-19/1024'))
+        self.assertEqual(b''.join(response.streaming_content), self.data[10:20])
+        self.assertEqual(b''.join(self.get(HTTP_RANGE='bytes=-5').streaming_content), self.data[-5:])
+        self.assertEqual(b''.join(self.get(HTTP_RANGE='bytes=1000-').streaming_content), self.data[1000:])
+        response = self.get(HTTP_RANGE='bytes=2000-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */1024'))
+
+    def test_validators(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.post('/media/src/clip.mp4').status_code, 405)
+
+    def test_partial_uploads_are_private(self):
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, PARTIAL_UPLOAD_DIR), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, PARTIAL_UPLOAD_DIR, '1.part'), 'wb') as file:
+            file.write(self.data)
+        self.assertEqual(self.client.get('/media/uploads/1.part').status_code, 404)
+        self.assertEqual(self.client.get('/media/src/../uploads/1.part').status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect')
+    def test_proxy_offload(self):
+        response = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/src/clip.mp4')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', MEDIA_ROOT=tempfile.mkdtemp())
+class StoryExpiryTests(APITestCase):
+    def setUp(self):
+        self.profiles = [User.objects.create(username=f'user{i}').userprofile for i in range(3)]
+
+    def add_story(self, owner, title, age):
+        story = Stories.objects.create(type='Фото', src=default_storage.save('src/story.png', ContentFile(png_bytes())),
+                                       title=title, owner=owner)
+        create_time = timezone.now() - age
+        Stories.objects.filter(pk=story.pk).update(create_time=create_time, expire_time=create_time + timedelta(days=1))
+        return Stories.objects.get(pk=story.pk)
+
+    def test_listing_groups_active_stories_by_owner(self):
+        self.add_story(self.profiles[0], 'old', timedelta(hours=5))
+        self.add_story(self.profiles[1], 'mid', timedelta(hours=3))
+        self.add_story(self.profiles[0], 'new', timedelta(hours=1))
+        self.add_story(self.profiles[2], 'gone', timedelta(days=2))
+        results = self.client.get('/en/stories/').data['results']
+        self.assertEqual([owner['id'] for owner in results], [self.profiles[0].pk, self.profiles[1].pk])
+        self.assertEqual([story['title'] for story in results[0]['stories']], ['new', 'old'])
+        page = self.client.get('/en/stories/?page_size=1').data
+        self.assertEqual(self.client.get(page['next']).data['results'][0]['id'], self.profiles[1].pk)
+        self.assertEqual([story['title'] for story in self.client.get(f'/users/{self.profiles[2].pk}/').data[
+            'stories']['results']], [])
+
+    def test_purge_removes_expired_stories_with_dependents(self):
+        expired = self.add_story(self.profiles[0], 'gone', timedelta(days=2))
+        active = self.add_story(self.profiles[1], 'kept', timedelta(hours=1))
+        comment = Comment.objects.create(body='c', owner=self.profiles[1], story=expired)
+        Like.objects.add(self.profiles[1], expired)
+        Like.objects.add(self.profiles[0], comment)
+        self.assertEqual(self.client.get(f'/en/stories/{expired.pk}/').status_code, 404)
+        documents = SearchDocument.objects.filter(Q(content_type__model='stories', object_id=expired.pk)
+                                                  | Q(content_type__model='comment', object_id=comment.pk))
+        self.assertEqual(documents.count(), 2)
+        stamp = get_stamps(['stories'])
+        self.assertEqual(purge_expired_stories(batch_size=1), 1)
+        self.assertNotEqual(get_stamps(['stories']), stamp)
+        self.assertEqual(list(Stories.objects.values_list('id', flat=True)), [active.pk])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(documents.exists())
+        self.assertFalse(default_storage.exists(expired.src.name))
+        self.assertTrue(default_storage.exists(active.src.name))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+})
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.profile = User.objects.create(username='author').userprofile
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='t', body='b', owner=self.profile)
+
+    def get(self, url='/en/posts/', **headers):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **headers)
+        return response, len(context.captured_queries)
+
+    def test_repeat_reads_hit_the_cache_or_revalidate(self):
+        first, _ = self.get()
+        second, queries = self.get()
+        self.assertEqual((queries, second.data), (0, first.data))
+        self.assertEqual(second['ETag'], first['ETag'])
+        not_modified, queries = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((not_modified.status_code, queries), (304, 0))
+        self.assertNotEqual(self.get('/ru/posts/')[0]['ETag'], first['ETag'])
+        self.assertNotEqual(self.get('/en/posts/?page_size=1')[0]['ETag'], first['ETag'])
+
+    def test_saves_likes_and_comments_invalidate(self):
+        etag = self.get()[0]['ETag']
+        Like.objects.add(self.profile, self.post)
+        response, _ = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['results'][0]['likes_count']), (200, 1))
+        Comment.objects.create(body='c', owner=self.profile, post=self.post)
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])[0]
+        self.assertEqual(len(response.data['results'][0]['comments_preview']), 1)
+        self.post.title = 'edited'
+        self.post.save()
+        self.assertEqual(self.get()[0].data['results'][0]['title'], 'edited')
+        news_etag = self.get('/en/news/')[0]['ETag']
+        self.assertEqual(self.get('/en/news/', HTTP_IF_NONE_MATCH=news_etag)[0].status_code, 304)
+
+    def test_logins_keep_lists_cached(self):
+        etag = self.get()[0]['ETag']
+        user = self.profile.user
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        user.first_name = 'Ann'
+        user.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)[0]
+        self.assertEqual(response.data['results'][0]['owner']['user']['first_name'], 'Ann')
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_stories_drop_out_when_they_expire(self):
+        story = Stories.objects.create(type='Фото', src='src/s.png', title='s', owner=self.profile)
+        first = self.get('/en/stories/')[0]
+        self.assertEqual(len(first.data['results']), 1)
+        later = story.expire_time + timedelta(seconds=1)
+        with mock.patch('django.utils.timezone.now', return_value=later), mock.patch('time.time',
+                                                                                      return_value=later.timestamp()):
+            response = self.get('/en/stories/', HTTP_IF_NONE_MATCH=first['ETag'])[0]
+        self.assertEqual((response.status_code, response.data['results']), (200, []))
+        Stories.objects.filter(pk=story.pk).update(expire_time=timezone.now() - timedelta(seconds=1))
+        response = self.get('/en/stories/', HTTP_IF_NONE_MATCH=first['ETag'])[0]
+        self.assertEqual((response.status_code, response.data['results']), (200, []))
+
+    def test_news_follow_liker_profiles(self):
+        news = News.objects.create(type='Фото', src='src/n.png', title='n', body='b')
+        Like.objects.add(self.profile, news)
+        etag = self.get('/en/news/')[0]['ETag']
+        self.profile.user.username = 'renamed'
+        self.profile.user.save()
+        self.assertEqual(self.get('/en/news/', HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+    def test_process_local_cache_needs_single_process(self):
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with override_settings(CACHES={'default': local, 'responses': local}, RESPONSE_CACHE_SINGLE_PROCESS=False):
+            self.get()
+            self.assertFalse(self.get()[0].has_header('ETag'))
+            with override_settings(RESPONSE_CACHE_SINGLE_PROCESS=True):
+                self.assertTrue(self.get()[0].has_header('ETag'))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class LanguageProjectionTests(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        profile = User.objects.create(username='author').userprofile
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='Salom', body='Dunyo', owner=profile)
+        Comment.objects.create(body='Zo‘r', owner=profile, post=self.post)
+
+    def test_reads_emit_only_the_requested_language(self):
+        item = self.client.get('/ru/posts/').data['results'][0]
+        self.assertEqual((item['title'], item['body'], item['comments_preview'][0]['body']), ('Salom', 'Dunyo', 'Zo‘r'))
+        process_translation_jobs()
+        with CaptureQueriesContext(connection) as context:
+            item = self.client.get(f'/ru/posts/{self.post.pk}/').data
+        self.assertEqual((item['title'], item['comments_preview'][0]['body']), ('[ru] Salom', '[ru] Zo‘r'))
+        self.assertFalse({'title_en', 'title_ru', 'body_uz'} & set(item))
+        self.assertFalse(any('title_en' in query['sql'] or 'body_uz' in query['sql']
+                             for query in context.captured_queries))
+        item = self.client.get(f'/ru/posts/{self.post.pk}/?all_langs=1').data
+        self.assertEqual((item['title'], item['title_en']), ('Salom', '[en] Salom'))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.profile = User.objects.create(username='author').userprofile
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='Toshkent bahori',
+                                         body='Bahor keldi, bahor!', owner=self.profile)
+        self.news = News.objects.create(type='Фото', src='src/a.png', title='Samarqand', body='Bahorgi sayohat')
+        self.comment = Comment.objects.create(body='Ajoyib bahor', owner=self.profile, post=self.post)
+
+    def results(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(item['type'], item['content']['id']) for item in response.data['results']]
+
+    def test_ranked_prefix_search_in_language(self):
+        self.assertEqual(self.results('/en/search/?q=bahor')[0], ('posts', self.post.pk))
+        self.assertEqual(set(self.results('/en/search/?q=bahor')),
+                         {('posts', self.post.pk), ('news', self.news.pk), ('comment', self.comment.pk)})
+        self.assertEqual(self.results('/en/search/?q=sam'), [('news', self.news.pk)])
+        self.assertEqual(self.results('/en/search/?q=bahor&type=comments'), [('comment', self.comment.pk)])
+        self.assertEqual(self.results('/ru/search/?q=[ru]'), [])
+        process_translation_jobs()
+        self.assertIn(('news', self.news.pk), self.results('/ru/search/?q=ru samarq'))
+        self.assertEqual(self.client.get('/en/search/').status_code, 400)
+        page = self.client.get('/en/search/?q=bahor&page_size=2').data
+        self.assertEqual(len(page['results']) + len(self.client.get(page['next']).data['results']), 3)
+
+    def test_index_follows_saves_deletes_and_rebuilds(self):
+        self.post.title = 'Kuz'
+        self.post.body = 'Yomg‘ir'
+        self.post.save()
+        self.assertEqual([document.object_id for document in search('kuz', 'en')], [self.post.pk])
+        self.news.delete()
+        self.assertEqual(len(search('bahor', 'en')), 1)
+        SearchDocument.objects.all().delete()
+        call_command('search_rebuild', chunk_size=1, stdout=StringIO())
+        self.assertEqual(SearchDocument.objects.count(), 2)
+        self.assertEqual(len(search('bahor', 'en')), 1)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class LikeBatchTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'fan{i}') for i in range(3)]
+        self.author = self.users[0].userprofile
+        self.posts = [Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b', owner=self.author)
+                      for i in range(3)]
+        self.comment = Comment.objects.create(body='c', owner=self.author, post=self.posts[0])
+        for user in self.users:
+            Like.objects.add(user.userprofile, self.posts[0])
+        Like.objects.add(self.users[1].userprofile, self.comment)
+        self.items = [{'type': 'posts', 'id': post.pk} for post in self.posts] + [
+            {'type': 'comments', 'id': self.comment.pk}]
+
+    def test_state_is_read_in_one_query(self):
+        self.client.force_authenticate(self.users[1])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/en/likes/state/', {'items': self.items}, format='json')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual([(item['likes_count'], item['liked']) for item in response.data['results']],
+                         [(3, True), (0, False), (0, False), (1, True)])
+        self.client.force_authenticate(None)
+        response = self.client.post('/en/likes/state/', {'items': self.items[:1]}, format='json')
+        self.assertEqual(response.data['results'][0]['liked'], False)
+        self.assertEqual(self.client.post('/en/likes/state/', {'items': [{'type': 'users', 'id': 1}]},
+                                          format='json').status_code, 400)
+
+    def test_batch_applies_queued_actions_in_order(self):
+        self.client.force_authenticate(self.users[2])
+        actions = [{'type': 'posts', 'id': self.posts[1].pk, 'action': 'like'},
+                   {'type': 'posts', 'id': self.posts[0].pk, 'action': 'unlike'},
+                   {'type': 'posts', 'id': self.posts[1].pk, 'action': 'like'},
+                   {'type': 'comments', 'id': self.comment.pk, 'action': 'like'},
+                   {'type': 'posts', 'id': 9999, 'action': 'like'}]
+        results = self.client.post('/en/likes/batch/', {'actions': actions}, format='json').data['results']
+        self.assertEqual([item['status'] for item in results], ['liked', 'unliked', 'unchanged', 'liked', 'not_found'])
+        self.assertEqual([(item['likes_count'], item['liked']) for item in results],
+                         [(1, True), (2, False), (1, True), (2, True), (0, False)])
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].likes_count, 2)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/en/likes/batch/', {'actions': actions}, format='json').status_code, 403)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend', COMMENT_PREVIEW_SIZE=2)
+class CommentPreviewTests(APITestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.profile = User.objects.create(username='author').userprofile
+        self.posts = [Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b', owner=self.profile)
+                      for i in range(3)]
+        self.comments = [Comment.objects.create(body=f'c{i}', owner=self.profile, post=self.posts[i % 2])
+                         for i in range(7)]
+
+    def test_lists_carry_count_and_latest_comments_only(self):
+        self.comments[6].delete()
+        with CaptureQueriesContext(connection) as context:
+            results = self.client.get('/en/posts/').data['results']
+        comment_queries = [query['sql'] for query in context.captured_queries if 'main_comment' in query['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('ROW_NUMBER', comment_queries[0])
+        by_id = {item['id']: item for item in results}
+        self.assertEqual(by_id[self.posts[0].pk]['comments_count'], 3)
+        self.assertEqual(by_id[self.posts[1].pk]['comments_count'], 3)
+        self.assertEqual([comment['body'] for comment in by_id[self.posts[0].pk]['comments_preview']], ['c4', 'c2'])
+        self.assertEqual(by_id[self.posts[2].pk]['comments_preview'], [])
+        self.assertNotIn('likes', by_id[self.posts[1].pk]['comments_preview'][0])
+        detail = self.client.get(f'/en/posts/{self.posts[1].pk}/').data
+        self.assertEqual([comment['body'] for comment in detail['comments_preview']], ['c5', 'c3'])
+        page = self.client.get(f'/en/posts/{self.posts[0].pk}/comments/?page_size=2').data
+        self.assertEqual([comment['body'] for comment in page['results']], ['c4', 'c2'])
+        self.assertEqual(self.client.get(page['next']).data['results'][0]['body'], 'c0')
+
+    def test_user_detail_prefetches_previews(self):
+        with CaptureQueriesContext(connection) as context:
+            posts = self.client.get(f'/users/{self.profile.pk}/').data['posts']['results']
+        preview_queries = [query['sql'] for query in context.captured_queries if 'ROW_NUMBER' in query['sql']]
+        by_id = {item['id']: item for item in posts}
+        self.assertEqual([comment['body'] for comment in by_id[self.posts[0].pk]['comments_preview']], ['c6', 'c4'])
+        self.assertEqual(len(preview_queries), 1)
+
+    def test_reconcile_fixes_drifted_comment_counts(self):
+        Posts.objects.filter(pk=self.posts[0].pk).update(comments_count=9)
+        call_command('reconcile_like_counts', stdout=StringIO())
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].comments_count, 4)
+
+
+@override_settings(USERS_STREAM_CHUNK_SIZE=3, STREAM_BLOCK_SIZE=16, STREAM_SPOOL_SIZE=8)
+class UserDirectoryStreamTests(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@example.com') for i in range(7)]
+
+    def test_json_is_streamed_from_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/users/useless/')
+            body = b''.join(response.streaming_content)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+        data = json.loads(body)
+        self.assertEqual(data, {'usernames': [user.username for user in self.users],
+                                'emails': [user.email for user in self.users], 'count': 7})
+
+    def test_ndjson_lines(self):
+        response = self.client.get('/users/useless/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0], {'username': 'user0', 'email': 'user0@example.com'})
+        self.assertEqual(lines[-1], {'count': 7})
+        self.assertEqual(len(lines), 8)
+        by_format = self.client.get('/users/useless/?format=ndjson')
+        self.assertEqual(b''.join(by_format.streaming_content).count(b'\n'), 8)
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class BenchmarkTests(APITestCase):
+    def test_seeded_graph_is_consistent_and_reproducible(self):
+        counts = seed_social_graph(users=15, follows=4, news=3, posts=2, stories=1, comments=3, likes=5, seed=7)
+        self.assertEqual(counts['users'], 15)
+        self.assertEqual(Like.objects.count(), counts['likes'])
+        for model in [Posts, Stories, Comment, News]:
+            content_type = ContentType.objects.get_for_model(model)
+            for obj in model.objects.all():
+                self.assertEqual(obj.likes_count, Like.objects.filter(content_type=content_type,
+                                                                      object_id=obj.pk).count())
+                self.assertEqual(obj.translation_status, TRANSLATION_DONE)
+        for post in Posts.objects.all():
+            self.assertEqual(post.comments_count, post.comments.count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(SearchDocument.objects.count(), counts['news'] + counts['posts'] + counts['stories']
+                         + counts['comments'])
+        followers = sorted(UserProfile.objects.annotate(total=Count('subscribers')).values_list('total', flat=True))
+        self.assertGreater(followers[-1], followers[len(followers) // 2])
+        again = seed_social_graph(users=15, follows=4, news=3, posts=2, stories=1, comments=3, likes=5, seed=7)
+        self.assertEqual(again, counts)
+        self.assertEqual(User.objects.count(), 15)
+
+    def test_report_and_comparison(self):
+        seed_social_graph(users=10, follows=3, news=2, posts=2, stories=1, comments=2, likes=4)
+        viewer, endpoints = default_endpoints()
+        report = run_benchmark(viewer, endpoints, repeat=1)
+        results = report['endpoints']
+        self.assertEqual(set(results), {endpoint['name'] for endpoint in endpoints})
+        self.assertEqual(results['posts_list']['status'], 200)
+        self.assertEqual(results['post_like']['status'], 200)
+        self.assertEqual(results['comment_create']['status'], 201)
+        self.assertGreater(results['posts_list']['queries'], 0)
+        self.assertGreater(results['feed']['bytes'], 0)
+        self.assertFalse(Comment.objects.filter(body=BENCHMARK_COMMENT).exists())
+        self.assertEqual(compare_reports(report, report), [])
+        slower = json.loads(json.dumps(report))
+        slower['endpoints']['feed'].update(queries=results['feed']['queries'] + 5,
+                                           time_ms=results['feed']['time_ms'] * 2 + 5)
+        self.assertEqual({item['metric'] for item in compare_reports(report, slower)}, {'queries', 'time_ms'})
+
+
+def owners_one_at_a_time(request):
+    """A deliberate N+1 for SQLProfilingTests: every post reads its owner with queries of its own."""
+    return JsonResponse({'owners': [post.owner.user.username for post in Posts.objects.all()]})
+
+
+urlpatterns = [path('n-plus-one/', owners_one_at_a_time), path('', include('dj_pro.urls'))]
+
+
+@override_settings(SQL_PROFILING=True, SQL_PROFILING_N_PLUS_ONE_THRESHOLD=2)
+class SQLProfilingTests(APITestCase):
+    def setUp(self):
+        slow_requests.clear()
+        self.profile = User.objects.create(username='author').userprofile
+        for i in range(4):
+            Posts.objects.create(type='Фото', src='src/a.png', title=f't{i}', body='b', owner=self.profile)
+
+    def test_normalized_shapes(self):
+        self.assertEqual(normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s, %s) LIMIT 21"),
+                         'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?')
+        self.assertEqual(normalize_sql('SELECT * FROM t WHERE b IN (%s)'),
+                         normalize_sql('SELECT * FROM t WHERE b IN (%s, %s)'))
+
+    @override_settings(ROOT_URLCONF='main.tests')
+    def test_profile_header_and_slow_request_log(self):
+        with self.assertLogs('main.profiling', 'WARNING'):
+            response = self.client.get('/n-plus-one/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+, nplusone;')
+        entry = slow_requests.entries()[0]
+        self.assertEqual(entry['path'], '/n-plus-one/')
+        self.assertTrue(entry['n_plus_one'])
+        self.assertGreater(entry['repeated'][0]['count'], 2)
+        self.assertGreaterEqual(entry['queries'], sum(shape['count'] for shape in entry['repeated']))
+        self.assertNotIn('nplusone', self.client.get('/users/useless/')['Server-Timing'])
+
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_authenticate(self.profile.user)
+        self.assertEqual(self.client.get('/profiling/slow-requests/').status_code, 403)
+        self.client.force_authenticate(staff)
+        results = self.client.get('/profiling/slow-requests/').data['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual([item['total_ms'] for item in results], sorted((item['total_ms'] for item in results),
+                                                                        reverse=True))
+        self.client.delete('/profiling/slow-requests/')
+        self.assertEqual(len(slow_requests.entries()), 1)
+
+    def test_bounded_to_slowest(self):
+        log = SlowRequestLog(2)
+        for total in [5, 1, 9, 3]:
+            log.record({'total_ms': total})
+        self.assertEqual([entry['total_ms'] for entry in log.entries()], [9, 5])
+
+    async def test_async_requests_are_profiled(self):
+        post = await Posts.objects.afirst()
+        response = await self.async_client.get(f'/en/posts/{post.pk}/like/')
+        self.assertEqual(response.json(), {'likes_count': 0})
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries"')
+
+    @override_settings(SQL_PROFILING=False)
+    def test_disabled(self):
+        self.assertFalse(self.client.get('/users/').has_header('Server-Timing'))
+
+
+@override_settings(TRANSLATION_BACKEND='main.translation.FakeTranslateBackend')
+class AsyncActionTests(APITestCase):
+    def setUp(self):
+        self.fan = User.objects.create(username='fan')
+        self.author = User.objects.create(username='author')
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='t', body='b',
+                                         owner=self.author.userprofile)
+        self.comment = Comment.objects.create(body='c', owner=self.author.userprofile, post=self.post)
+
+    def test_subscribe_and_unsubscribe(self):
+        url = f'/users/{self.author.userprofile.pk}/'
+        self.assertEqual(self.client.post(url + 'subscribe/').status_code, 403)
+        self.client.force_authenticate(self.fan)
+        self.assertEqual(self.client.post(url + 'subscribe/').json(), {'message': 'Ты подписался на author'})
+        self.assertEqual(self.client.post(url + 'subscribe/').json(), {'message': 'Ты уже подписался на author'})
+        self.assertEqual(self.client.get(url + 'subscribe/').json(), {'subscribers_count': 1})
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.fan.userprofile, object_id=self.post.pk).exists())
+        self.assertEqual(self.client.post(f'/users/{self.fan.userprofile.pk}/subscribe/').json(),
+                         {'message': 'Ты не можешь подписаться на себя.'})
+        self.assertEqual(self.client.post(url + 'unsubscribe/').json(), {'message': 'Ты отписался от author'})
+        self.assertEqual(self.client.post(url + 'unsubscribe/').json(), {'message': 'Ты не подписан на author'})
+        self.assertEqual(self.client.get('/users/999999/subscribe/').status_code, 404)
+        self.assertEqual(self.client.put(url + 'subscribe/').status_code, 405)
+
+    def test_sync_actions_answer_the_same(self):
+        self.client.force_authenticate(self.fan)
+        url = f'/users/{self.author.userprofile.pk}/subscribe/'
+        with override_settings(ROOT_URLCONF=sync_actions_urlconf):
+            self.assertEqual(self.client.post(url).data, {'message': 'Ты подписался на author'})
+            self.assertEqual(self.client.post(f'/en/posts/{self.post.pk}/like/').data, {'status': 'Post liked.'})
+        self.assertEqual(self.client.post(url).json(), {'message': 'Ты уже подписался на author'})
+        self.assertEqual(self.client.post(f'/en/posts/{self.post.pk}/like/').json(),
+                         {'status': 'You already liked this post.'})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Subscription.objects.create(subscriber=self.fan.userprofile, subscribed_to=self.author.userprofile)
+
+    def test_comment_like_and_lookups(self):
+        self.client.force_authenticate(self.fan)
+        url = f'/en/posts/{self.post.pk}/comments/{self.comment.pk}/'
+        self.assertEqual(self.client.post(url + 'like/').json(), {'status': 'Comment liked.'})
+        self.assertEqual(self.client.get(url + 'like/').json(), {'likes_count': 1})
+        self.assertEqual(self.client.post(f'/en/stories/{self.post.pk}/comments/{self.comment.pk}/like/').status_code,
+                         404)
+        self.assertEqual(self.client.post(f'/xx/posts/{self.post.pk}/like/').status_code, 404)
+
+    async def test_served_natively_in_async_mode(self):
+        url = f'/en/posts/{self.post.pk}/like/'
+        self.assertEqual((await self.async_client.get(url)).json(), {'likes_count': 0})
+        self.assertEqual((await self.async_client.post(url)).status_code, 403)
+        await self.async_client.aforce_login(self.fan)
+        self.assertEqual((await self.async_client.post(url)).json(), {'status': 'Post liked.'})
+        self.assertEqual((await self.async_client.get(url)).json(), {'likes_count': 1})
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_ROUTERS=['main.replicas.PrimaryReplicaRouter'])
+class ReplicaRoutingTests(APITransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A throwaway SQLite file as the replica (settings only configure one from the environment);
+        # sync_replicas() fills it from the test database.
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings['replica'] = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.replica_dir, 'replica')},
+        })['replica']
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        response_cache().clear()
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].clear()
+        self.fan = User.objects.create(username='fan')
+        self.author = User.objects.create(username='author').userprofile
+        self.post = Posts.objects.create(type='Фото', src='src/a.png', title='t', body='b', owner=self.author)
+        sync_replicas()
+
+    def test_reads_lag_until_the_replica_syncs(self):
+        Posts.objects.create(type='Фото', src='src/b.png', title='t2', body='b2', owner=self.author)
+        response = self.client.get('/en/posts/')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertFalse(response.has_header('ETag'))
+        sync_replicas()
+        self.assertEqual(len(self.client.get('/en/posts/').data['results']), 2)
+
+    def test_writers_read_their_own_writes(self):
+        self.client.force_login(self.fan)
+        self.assertEqual(self.client.post(f'/en/posts/{self.post.pk}/like/').json(), {'status': 'Post liked.'})
+        self.assertEqual(self.client.get('/en/posts/').data['results'][0]['likes_count'], 1)
+        self.client.logout()
+        self.assertEqual(self.client.get(f'/en/posts/{self.post.pk}/like/').json(), {'likes_count': 1})
+        self.assertEqual(self.client.get('/en/posts/').data['results'][0]['likes_count'], 0)
+
+    def test_get_or_create_reads_the_primary(self):
+        post = Posts.objects.create(type='Фото', src='src/b.png', title='t2', body='b2', owner=self.author)
+        with replica_reads():
+            self.assertFalse(Posts.objects.filter(pk=post.pk).exists())
+            self.assertFalse(Posts.objects.get_or_create(pk=post.pk, defaults={'owner': self.author})[1])
+            self.assertTrue(Posts.objects.filter(pk=post.pk).exists())
+
+
+@override_settings(SQLITE_WRITE_RETRY_DELAY=0)
+class SQLiteTuningTests(TransactionTestCase):
+    def test_new_connections_get_the_pragmas(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            for name, expected in [('synchronous', 1), ('busy_timeout', 5000), ('cache_size', -64 * 1024)]:
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_serialized_write_retries_lock_errors(self):
+        calls = []
+
+        @serialized_write
+        def write(error):
+            calls.append(connection.in_atomic_block)
+            if len(calls) < 3:
+                raise error
+            return len(calls)
+
+        self.assertEqual(write(OperationalError('database is locked')), 3)
+        self.assertEqual(calls, [True] * 3)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            write(OperationalError('no such table: main_foo'))
+        self.assertEqual(len(calls), 1)
+        calls.clear()
+        with override_settings(SQLITE_WRITE_RETRIES=1), self.assertRaises(OperationalError):
+            write(OperationalError('database is locked'))
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Posts, Stories, Subscription, TimelineEntry
+
+TIMELINE_MODELS = [Posts, Stories]
+
+
+def entries_for(owner_ids, obj):
+    content_type = ContentType.objects.get_for_model(obj)
+    return [TimelineEntry(owner_id=owner_id, author_id=obj.owner_id, content_type=content_type, object_id=obj.pk,
+                          create_time=obj.create_time) for owner_id in owner_ids]
+
+
+def write_entries(entries):
+    size = settings.FEED_WRITE_BATCH_SIZE
+    for start in range(0, len(entries), size):
+        TimelineEntry.objects.bulk_create(entries[start:start + size], ignore_conflicts=True)
+
+
+def is_fan_out_author(author_id):
+    limit = settings.FEED_FANOUT_LIMIT
+    return not Subscription.objects.filter(subscribed_to_id=author_id)[limit:limit + 1].exists()
+
+
+def fan_out(obj):
+    """Push a new post or story into the timelines of its author and followers.
+
+    Authors with more than FEED_FANOUT_LIMIT followers are skipped; their content is pulled in at read time.
+    """
+    if not is_fan_out_author(obj.owner_id):
+        write_entries(entries_for([obj.owner_id], obj))
+        return
+    followers = Subscription.objects.filter(subscribed_to_id=obj.owner_id).values_list('subscriber_id', flat=True)
+    batch = [obj.owner_id]
+    for follower_id in followers.iterator(chunk_size=settings.FEED_WRITE_BATCH_SIZE):
+        batch.append(follower_id)
+        if len(batch) >= settings.FEED_WRITE_BATCH_SIZE:
+            write_entries(entries_for(batch, obj))
+            batch = []
+    write_entries(entries_for(batch, obj))
+
+
+def recent_content(author_ids, since=None, per_model=None):
+    for model in TIMELINE_MODELS:
+        queryset = model.objects.filter(owner_id__in=author_ids)
+        if since is not None:
+            queryset = queryset.filter(create_time__gt=since)
+        queryset = queryset.order_by('-create_time').only('id', 'owner_id', 'create_time')
+        yield from (queryset[:per_model] if per_model else queryset)
+
+
+def backfill_timeline(profile, authors=None, per_model=None):
+    """Fill ``profile``'s timeline with recent content from the given authors (default: everyone it follows)."""
+    if authors is None:
+        authors = list(Subscription.objects.filter(subscriber=profile).values_list('subscribed_to_id', flat=True))
+        authors.append(profile.pk)
+    per_model = per_model or settings.FEED_MAX_ENTRIES
+    entries = [entry for obj in recent_content(authors, per_model=per_model)
+               for entry in entries_for([profile.pk], obj)]
+    write_entries(entries)
+    return len(entries)
+
+
+def pull_high_follower_content(profile):
+    """Fan-out-on-read: copy new content of followed high-follower accounts into the timeline."""
+    popular = Subscription.objects.filter(subscribed_to__in=Subscription.objects.filter(
+        subscriber=profile).values('subscribed_to')).values('subscribed_to').annotate(
+        followers=Count('id')).filter(followers__gt=settings.FEED_FANOUT_LIMIT).values_list('subscribed_to', flat=True)
+    authors = list(popular)
+    if not authors:
+        return 0
+    since = TimelineEntry.objects.filter(owner=profile, author_id__in=authors).aggregate(
+        latest=Max('create_time'))['latest']
+    if since is None:
+        since = timezone.now() - settings.FEED_PULL_WINDOW
+    entries = [entry for obj in recent_content(authors, since=since, per_model=settings.FEED_MAX_ENTRIES)
+               for entry in entries_for([profile.pk], obj)]
+    write_entries(entries)
+    return len(entries)
+
+
+def trim_timelines(max_entries=None):
+    """Delete timeline entries beyond the newest ``max_entries`` of each user; returns the number deleted."""
+    max_entries = max_entries or settings.FEED_MAX_ENTRIES
+    deleted = 0
+    owners = TimelineEntry.objects.values('owner').annotate(total=Count('id')).filter(
+        total__gt=max_entries).values_list('owner', flat=True)
+    for owner_id in list(owners):
+        entries = TimelineEntry.objects.filter(owner_id=owner_id)
+        cutoff = entries.order_by('-create_time', '-id').values_list('create_time', 'id')[max_entries - 1]
+        older = entries.filter(create_time__lte=cutoff[0]).exclude(create_time=cutoff[0], id__gte=cutoff[1])
+        deleted += older.delete()[0]
+    return deleted
@@ -1,8 +1,240 @@
-from googletrans import Translator
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils.module_loading import import_string
+from .caching import invalidate
+from .jobs import JOB_DONE, JOB_FAILED, claim_jobs, enqueue_job, fail_jobs
 
-translator = Translator()
+TRANSLATION_LANGUAGES = ['en', 'ru', 'uz']
+
+TRANSLATION_PENDING = 'pending'
+TRANSLATION_DONE = 'done'
+TRANSLATION_FAILED = 'failed'
+TRANSLATION_STATUS_CHOICES = [
+    (TRANSLATION_PENDING, 'Pending'),
+    (TRANSLATION_DONE, 'Done'),
+    (TRANSLATION_FAILED, 'Failed'),
+]
+
+
+class GoogleTranslateBackend:
+    def __init__(self):
+        from googletrans import Translator
+        self.translator = Translator()
+
+    def translate(self, texts, dest_language):
+        translations = self.translator.translate(list(texts), dest=dest_language)
+        return [translation.text for translation in translations]
+
+
+class FakeTranslateBackend:
+    """Offline backend for tests and local development: tags the text with the target language."""
+
+    calls = 0
+
+    def translate(self, texts, dest_language):
+        FakeTranslateBackend.calls += 1
+        return [f'[{dest_language}] {text}' for text in texts]
+
+
+_backends = {}
+
+
+def get_backend():
+    path = settings.TRANSLATION_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def source_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """Translation memory keyed by (source hash, language): an in-process LRU in front of TranslationMemory."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def _remember(self, key, translation):
+        self.entries[key] = translation
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_many(self, texts, dest_language):
+        from .models import TranslationMemory
+        found = {}
+        hashes = {}
+        with self.lock:
+            for text in texts:
+                key = (source_hash(text), dest_language)
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[text] = self.entries[key]
+                else:
+                    hashes[key[0]] = text
+        if hashes:
+            rows = TranslationMemory.objects.filter(language=dest_language, source_hash__in=list(hashes)).values_list(
+                'source_hash', 'translation')
+            with self.lock:
+                for digest, translation in rows:
+                    found[hashes[digest]] = translation
+                    self._remember((digest, dest_language), translation)
+        with self.lock:
+            self.stats['db_hits'] += len(found) - (len(texts) - len(hashes))
+            self.stats['memory_hits'] += len(texts) - len(hashes)
+            self.stats['misses'] += len(texts) - len(found)
+        return found
+
+    def set_many(self, translations, dest_language):
+        from .models import TranslationMemory
+        rows = [TranslationMemory(source_hash=source_hash(text), language=dest_language, translation=translation)
+                for text, translation in translations.items()]
+        TranslationMemory.objects.bulk_create(rows, ignore_conflicts=True)
+        with self.lock:
+            for row in rows:
+                self._remember((row.source_hash, dest_language), row.translation)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+translation_cache = TranslationCache(settings.TRANSLATION_CACHE_SIZE)
+
+
+def translation_cache_stats():
+    stats = dict(translation_cache.stats)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def unused_translation_fields(model, lang):
+    """The per-language columns of ``model`` that a projection to ``lang`` never reads."""
+    return [f'{field}_{language}' for field in model.translatable_fields for language in TRANSLATION_LANGUAGES
+            if language != lang]
 
 
 def translate_text(text, dest_language):
-    translation = translator.translate(text, dest=dest_language)
-    return translation.text
+    return translate_many([text], dest_language)[0]
+
+
+def translate_many(texts, dest_language, batch_size=None, workers=None):
+    """Translate ``texts`` into one language.
+
+    Texts already in the translation memory are served from it; the rest are sent to the backend in
+    concurrent batches and stored.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    unique = list(dict.fromkeys(texts))
+    found = translation_cache.get_many(unique, dest_language)
+    missing = [text for text in unique if text not in found]
+    if missing:
+        batch_size = batch_size or settings.TRANSLATION_BATCH_SIZE
+        workers = workers or settings.TRANSLATION_WORKERS
+        backend = get_backend()
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+            results = executor.map(lambda batch: backend.translate(batch, dest_language), batches)
+        translated = dict(zip(missing, [text for batch in results for text in batch]))
+        translation_cache.set_many(translated, dest_language)
+        found.update(translated)
+    return [found[text] for text in texts]
+
+
+def enqueue_translation(instance, fields):
+    from .models import TranslationJob
+    job, created = enqueue_job(TranslationJob, instance, defaults={'fields': ','.join(fields)})
+    if not created:
+        merged = [field for field in instance.translatable_fields if field in fields or field in job.field_list]
+        if merged != job.field_list:
+            job.fields = ','.join(merged)
+            job.save(update_fields=['fields', 'update_time'])
+
+
+def retry_failed_translations():
+    """Queue every object whose translation failed for good again, with a fresh set of attempts.
+
+    The new job covers all translatable fields and merges into a job already pending for the object. Returns the
+    number of objects queued.
+    """
+    from .models import TranslationJob
+    failed = TranslationJob.objects.filter(status=JOB_FAILED)
+    by_type = {}
+    for content_type, object_id in failed.values_list('content_type', 'object_id'):
+        by_type.setdefault(content_type, set()).add(object_id)
+    queued = 0
+    with transaction.atomic():
+        failed.delete()
+        for content_type_id, object_ids in by_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            for obj in model.objects.filter(pk__in=object_ids):
+                enqueue_translation(obj, obj.translatable_fields)
+                queued += 1
+            model.objects.filter(pk__in=object_ids).update(translation_status=TRANSLATION_PENDING)
+    return queued
+
+
+def process_translation_jobs(limit=None, workers=None):
+    """Run one round of the translation queue and return the number of jobs handled."""
+    from .models import TranslationJob
+    from .search import index_objects
+    jobs = claim_jobs(TranslationJob, limit or settings.TRANSLATION_BATCH_SIZE)
+    if not jobs:
+        return 0
+
+    objects = {}
+    fields = {}
+    by_type = {}
+    for job in jobs:
+        by_type.setdefault(job.content_type, []).append(job.object_id)
+        key = (job.content_type_id, job.object_id)
+        job_fields = job.field_list or job.content_type.model_class().translatable_fields
+        fields[key] = fields.get(key, []) + [field for field in job_fields if field not in fields.get(key, [])]
+    for content_type, object_ids in by_type.items():
+        model = content_type.model_class()
+        for pk, obj in model.objects.in_bulk(object_ids).items():
+            objects[(content_type.id, pk)] = obj
+
+    texts = {getattr(obj, field) for key, obj in objects.items() for field in fields[key]}
+    texts = sorted(text for text in texts if text)
+    translated = {}
+    try:
+        for lang in TRANSLATION_LANGUAGES:
+            translated[lang] = dict(zip(texts, translate_many(texts, lang, workers=workers)))
+    except Exception as error:
+        for job in fail_jobs(jobs, error, settings.TRANSLATION_MAX_ATTEMPTS):
+            if (job.content_type_id, job.object_id) in objects:
+                job.content_type.model_class().objects.filter(pk=job.object_id).update(
+                    translation_status=TRANSLATION_FAILED)
+        return len(jobs)
+
+    with transaction.atomic():
+        for key, obj in objects.items():
+            values = {'translation_status': TRANSLATION_DONE}
+            for field in fields[key]:
+                source = getattr(obj, field)
+                for lang in TRANSLATION_LANGUAGES:
+                    values[f'{field}_{lang}'] = translated[lang].get(source, source)
+            obj.__class__.objects.filter(pk=obj.pk).update(**values)
+            for name, value in values.items():
+                setattr(obj, name, value)
+        TranslationJob.objects.filter(id__in=[job.id for job in jobs], claim=jobs[0].claim).update(
+            status=JOB_DONE, error='')
+        index_objects(objects.values())
+        invalidate(*objects.values())
+    return len(jobs)
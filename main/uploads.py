@@ -0,0 +1,131 @@
+import hashlib
+import os
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+UPLOAD_OPEN = 'open'
+UPLOAD_COMPLETE = 'complete'
+UPLOAD_ATTACHED = 'attached'
+UPLOAD_STATUS_CHOICES = [
+    (UPLOAD_OPEN, 'Open'),
+    (UPLOAD_COMPLETE, 'Complete'),
+    (UPLOAD_ATTACHED, 'Attached'),
+]
+
+READ_BLOCK_SIZE = 64 * 1024
+# Half-finished uploads, inside MEDIA_ROOT so that finalize_upload can move them into src/ without copying; never
+# served (main.serving).
+PARTIAL_UPLOAD_DIR = 'uploads'
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(session):
+    directory = os.path.join(settings.MEDIA_ROOT, PARTIAL_UPLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{session.pk}.part')
+
+
+def append_chunk(session, index, stream, length, checksum):
+    """Stream one chunk from ``stream`` onto the end of the session's partial file.
+
+    The chunk is hashed while it is written and rolled back if the size or SHA-256 does not match ``checksum``.
+    Chunks already received are accepted again without being written, so clients can safely retry.
+    """
+    from .models import UploadSession
+    if session.status != UPLOAD_OPEN:
+        raise UploadError("Загрузка уже завершена.", status=409)
+    if index < session.chunks:
+        return session
+    if index > session.chunks:
+        raise UploadError(f"Ожидается часть {session.chunks}.", status=409)
+    if not checksum:
+        raise UploadError("Нужен заголовок X-Chunk-SHA256.")
+    if length <= 0 or length > settings.UPLOAD_CHUNK_SIZE:
+        raise UploadError(f"Размер части должен быть от 1 до {settings.UPLOAD_CHUNK_SIZE} байт.", status=413)
+    if session.received + length > session.size:
+        raise UploadError("Часть выходит за объявленный размер файла.")
+
+    path = partial_path(session)
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, 'ab') as output:
+        output.truncate(session.received)
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            digest.update(block)
+            output.write(block)
+            written += len(block)
+        if written != length or digest.hexdigest() != checksum.lower():
+            output.truncate(session.received)
+            raise UploadError("Контрольная сумма части не совпадает.")
+    updated = UploadSession.objects.filter(pk=session.pk, chunks=index, status=UPLOAD_OPEN).update(
+        received=F('received') + written, chunks=F('chunks') + 1, update_time=timezone.now())
+    if not updated:
+        raise UploadError("Часть уже загружена другим запросом.", status=409)
+    session.refresh_from_db()
+    return session
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(session):
+    """Verify the assembled file, probe it and move it into ``src/`` without copying."""
+    from .media import MediaProbeError, probe_media
+    if session.status != UPLOAD_OPEN:
+        return session
+    path = partial_path(session)
+    if session.received != session.size or not os.path.exists(path) or os.path.getsize(path) != session.size:
+        raise UploadError(f"Получено {session.received} из {session.size} байт.", status=409)
+    if session.sha256 and file_sha256(path) != session.sha256.lower():
+        raise UploadError("Контрольная сумма файла не совпадает.")
+    try:
+        with open(path, 'rb') as source:
+            probe = probe_media(source)
+    except MediaProbeError as error:
+        raise UploadError(str(error))
+    name = default_storage.get_available_name(os.path.join('src', os.path.basename(session.filename)))
+    os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+    os.replace(path, default_storage.path(name))
+    session.name = name
+    session.media_kind = probe['kind']
+    session.media_container = probe['container']
+    session.media_codec = probe['codec']
+    session.status = UPLOAD_COMPLETE
+    session.save()
+    return session
+
+
+def collect_abandoned_uploads(older_than=None, batch_size=500):
+    """Delete sessions idle for longer than UPLOAD_SESSION_TTL along with files nobody attached.
+
+    Returns the number of sessions removed.
+    """
+    from .models import UploadSession
+    cutoff = timezone.now() - (older_than or settings.UPLOAD_SESSION_TTL)
+    removed = 0
+    while True:
+        sessions = list(UploadSession.objects.filter(update_time__lt=cutoff)[:batch_size])
+        if not sessions:
+            return removed
+        for session in sessions:
+            if session.status == UPLOAD_OPEN and os.path.exists(partial_path(session)):
+                os.remove(partial_path(session))
+            elif session.status == UPLOAD_COMPLETE and session.name:
+                default_storage.delete(session.name)
+        UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+        removed += len(sessions)
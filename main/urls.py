@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from dj_rest_auth.views import *
-from django.urls import path, include
+from django.urls import path, include, re_path
+from .async_views import like_action, subscription_action
 from .views import *
 
 router = DefaultRouter()
@@ -8,14 +9,27 @@ router.register('likes', LikeViewSet, basename='likes')
 router.register('news', NewsViewSet, basename='news')
 router.register('posts', PostsViewSet, basename='posts')
 router.register('stories', StoriesViewSet, basename='stories')
+router.register('feed', FeedViewSet, basename='feed')
+router.register('search', SearchViewSet, basename='search')
 router.register(r'(?P<model_type>stories|posts)/(?P<model_pk>\d+)/comments', CommentViewSet,
                 basename='comments')
 router_for_users = DefaultRouter()
 router_for_users.register('users', UserViewSet, basename='users')
+router_for_users.register('uploads', UploadSessionViewSet, basename='uploads')
 
-urlpatterns = [
-    path('', include(router_for_users.urls)),
+# Async views take over the hot like/unlike and subscribe/unsubscribe actions of the viewsets below.
+async_urlpatterns = [
+    re_path(r'^users/(?P<pk>\d+)/(?P<verb>subscribe|unsubscribe)/$', subscription_action, name='subscription_action'),
+    re_path(r'^(?P<lang>[^/.]+)/(?P<model_type>news|posts|stories)/(?P<pk>\d+)/(?P<verb>like|unlike)/$', like_action,
+            name='like_action'),
+    re_path(r'^(?P<lang>[^/.]+)/(?P<model_type>stories|posts)/(?P<model_pk>\d+)/comments/(?P<pk>\d+)/'
+            r'(?P<verb>like|unlike)/$', like_action, name='comment_like_action'),
+]
+
+urlpatterns = async_urlpatterns + [
     path('users/useless/', UsersUselessView.as_view(), name='users_useless'),
+    path('profiling/slow-requests/', SlowRequestsView.as_view(), name='slow_requests'),
+    path('', include(router_for_users.urls)),
     path('password/change/', PasswordChangeView.as_view(), name='password_change'),
     path('password/reset/', PasswordResetView.as_view(), name='password_reset'),
     path('password/reset/confirm/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
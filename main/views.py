@@ -2,26 +2,62 @@ from dj_rest_auth.registration.views import RegisterView as DefaultRegisterView
 from dj_rest_auth.registration.views import VerifyEmailView
 from rest_framework.exceptions import PermissionDenied, NotFound
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from allauth.account.models import EmailConfirmation, EmailConfirmationHMAC
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404, redirect
 from django.core.mail import EmailMessage
-from rest_framework import viewsets, generics, status
+from rest_framework import viewsets, generics, mixins, status
+from .pagination import KeysetPagination, StoryTrayPagination, UserKeysetPagination
 from .permissions import *
 from .serializers import *
-from django.http import Http404
+from .caching import cached_response
+from .profiling import slow_requests
+from .replicas import primary
+from .search import search
+from .sqlite import serialized_write
+from .streaming import NDJSONRenderer, stream_columns_json, stream_ndjson
+from .translation import unused_translation_fields
+from .timeline import pull_high_follower_content
+from .uploads import UploadError, append_chunk, finalize_upload
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse
 from django.apps import apps
+from django.db import transaction
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Max, Min
+from django.utils import timezone
+from .likes import like_queryset, like_status
+from .loaders import comments_prefetch
 from .models import *
 
 
 class UsersUselessView(APIView):
+    renderer_classes = [JSONRenderer, NDJSONRenderer]
+
+    def get(self, request):
+        rows = User.objects.order_by('id').values_list('username', 'email').iterator(
+            chunk_size=settings.USERS_STREAM_CHUNK_SIZE)
+        if request.accepted_renderer.format == 'ndjson':
+            return StreamingHttpResponse(stream_ndjson(rows, ['username', 'email']),
+                                         content_type=NDJSONRenderer.media_type)
+        return StreamingHttpResponse(stream_columns_json(rows, ['username', 'email']), content_type='application/json')
+
+
+class SlowRequestsView(APIView):
+    """The slowest requests recorded by SQLProfilingMiddleware in this process, slowest first."""
+
+    permission_classes = [permissions.IsAdminUser, ]
+
     def get(self, request):
-        users = User.objects.all()
-        data = {"count": users.count(), "usernames": [user.username for user in users],
-                "emails": [user.email for user in users]}
-        return Response(data)
+        return Response({'enabled': settings.SQL_PROFILING, 'results': slow_requests.entries()})
+
+    def delete(self, request):
+        slow_requests.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class RegisterView(DefaultRegisterView):
@@ -64,15 +100,62 @@ class ConfirmEmailView(VerifyEmailView):
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = UserProfile.objects.all().order_by('-user__date_joined')
     serializer_class = UserSerializer
     permission_classes = [IsOwnerOrReadOnlyForUsers, ]
+    pagination_class = UserKeysetPagination
+
+    def use_summary(self):
+        params = self.request.query_params
+        return self.action == 'list' or (self.action == 'retrieve' and ('fields' in params or 'expand' in params))
+
+    def get_queryset(self):
+        queryset = UserProfile.objects.select_related('user').order_by('-user__date_joined')
+        if self.use_summary():
+            return queryset.with_counts()
+        return queryset
+
+    def get_serializer_class(self):
+        if self.use_summary():
+            return UserProfileSummarySerializer
+        return UserSerializer
+
+    def collection(self, name):
+        queryset, serializer_class, pagination_class = user_collection(name, self.get_object())
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True,
+                                                                 context=self.get_serializer_context()).data)
+
+    @action(detail=True)
+    def stories(self, request, pk=None):
+        return self.collection('stories')
+
+    @action(detail=True)
+    def posts(self, request, pk=None):
+        return self.collection('posts')
+
+    @action(detail=True)
+    def comments(self, request, pk=None):
+        return self.collection('comments')
+
+    @action(detail=True)
+    def likes(self, request, pk=None):
+        return self.collection('likes')
+
+    @action(detail=True)
+    def subscribers(self, request, pk=None):
+        return self.collection('subscribers')
+
+    @action(detail=True)
+    def subscriptions(self, request, pk=None):
+        return self.collection('subscriptions')
 
     def create(self, request, *args, **kwargs):
         return Response({"message": "Go to 'http://127.0.0.1:3000/register/' for authentication"},
                         status=status.HTTP_403_FORBIDDEN)
 
-    @action(detail=True, methods=['get', 'post'])
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @primary
     def subscribe(self, request, pk=None):
         userprofile = self.get_object()
         if request.method == 'GET':
@@ -86,7 +169,8 @@ class UserViewSet(viewsets.ModelViewSet):
                 return Response({"message": f"Ты подписался на {userprofile.user.username}"})
             return Response({"message": f"Ты уже подписался на {userprofile.user.username}"})
 
-    @action(detail=True, methods=['get', 'post'])
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @primary
     def unsubscribe(self, request, pk=None):
         userprofile = self.get_object()
         if request.method == 'GET':
@@ -101,25 +185,147 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response({"message": f"Ты не подписан на {userprofile.user.username}"})
 
 
-class LikeViewSet(viewsets.ModelViewSet):
+class LikeActionsMixin:
+    """like/unlike actions; main.async_views answers the same paths with the same lookups and bodies."""
+
+    def like_object(self):
+        queryset = like_queryset(self.kwargs['lang'], self.kwargs.get('model_type', self.basename),
+                                 self.kwargs.get('model_pk'))
+        obj = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def like_action(self, request, verb):
+        obj = self.like_object()
+        if request.method == 'POST':
+            changed = (Like.objects.add if verb == 'like' else Like.objects.remove)(request.user.userprofile, obj)
+            return Response(like_status(self.kwargs.get('model_type', self.basename), verb, changed,
+                                        self.kwargs.get('model_pk')))
+        return Response({'likes_count': obj.likes_count})
+
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @primary
+    def like(self, request, *args, **kwargs):
+        return self.like_action(request, 'like')
+
+    @action(detail=True, methods=['get', 'post'], permission_classes=[permissions.IsAuthenticatedOrReadOnly])
+    @primary
+    def unlike(self, request, *args, **kwargs):
+        return self.like_action(request, 'unlike')
+
+
+class LanguageProjectionViewMixin:
+    """Skip loading the translation columns a projected read (see LanguageProjectionMixin) never renders."""
+
+    def projection_language(self):
+        return projection_language(self.get_serializer_context())
+
+    def project(self, queryset):
+        lang = self.projection_language()
+        return queryset.defer(*unused_translation_fields(queryset.model, lang)) if lang else queryset
+
+
+class CachedListMixin:
+    """Serve ``list`` through the response cache; ``cache_labels`` name the version stamps the output depends on.
+
+    ``cache_expires`` returns the next time the list changes on its own, with no write to bump a stamp.
+    """
+
+    cache_labels = []
+
+    def cache_expires(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, self.cache_labels, lambda: self.build_list(request, *args, **kwargs),
+                               expires=self.cache_expires())
+
+    def build_list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class LikeViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                  mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Likes are created and removed through ``Like.objects`` so ``likes_count`` stays exact; they are never updated."""
+
     permission_classes = [permissions.IsAuthenticated, ]
-    queryset = Like.objects.all()
+    queryset = Like.objects.select_related('owner__user')
     serializer_class = LikeSerializer
+    pagination_class = KeysetPagination
 
-
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        obj = get_object_or_404(data['content_type'].model_class(), pk=data['object_id'])
+        Like.objects.add(self.request.user.userprofile, obj)
+        serializer.instance = Like.objects.get(owner=self.request.user.userprofile,
+                                               content_type=data['content_type'], object_id=obj.pk)
+
+    def perform_destroy(self, instance):
+        if instance.content_object is None:
+            instance.delete()
+        else:
+            Like.objects.remove(instance.owner, instance.content_object)
+
+    def like_states(self, items):
+        owner = self.request.user.userprofile if self.request.user.is_authenticated else None
+        keys = [(ContentType.objects.get_for_model(CONTENT_MODELS[item['type']]).id, item['id']) for item in items]
+        states = Like.objects.states(owner, keys)
+        return [{'likes_count': states[key][0], 'liked': states[key][1]} for key in keys]
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def state(self, request, lang=None):
+        """Like count and liked-by-me for a list of {type, id} items, read in a single query."""
+        serializer = LikeStateRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        results = [{'type': item['type'], 'id': item['id'], **state}
+                   for item, state in zip(items, self.like_states(items))]
+        return Response({'results': results})
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request, lang=None):
+        """Apply queued like/unlike actions in order, in one transaction, and return the resulting states."""
+        serializer = LikeBatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        actions = serializer.validated_data['actions']
+        owner = request.user.userprofile
+        results = []
+        with transaction.atomic():
+            objects = {}
+            for name in {item['type'] for item in actions}:
+                model = CONTENT_MODELS[name]
+                queryset = model.objects.active() if model is Stories else model.objects.all()
+                objects[name] = queryset.in_bulk([item['id'] for item in actions if item['type'] == name])
+            for item in actions:
+                obj = objects[item['type']].get(item['id'])
+                if obj is None:
+                    outcome = 'not_found'
+                elif item['action'] == 'like':
+                    outcome = 'liked' if Like.objects.add(owner, obj) else 'unchanged'
+                else:
+                    outcome = 'unliked' if Like.objects.remove(owner, obj) else 'unchanged'
+                results.append({'type': item['type'], 'id': item['id'], 'action': item['action'], 'status': outcome})
+        for result, state in zip(results, self.like_states(results)):
+            result.update(state)
+        return Response({'results': results})
+
+
+class CommentViewSet(LanguageProjectionViewMixin, LikeActionsMixin, viewsets.ModelViewSet):
     permission_classes = [IsOwnerOrReadOnly, ]
     serializer_class = CommentSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         model_type = self.kwargs['model_type'].capitalize()
         model = apps.get_model('main', model_type)
         model_instance = get_object_or_404(model, pk=self.kwargs['model_pk'])
+        comments = self.project(Comment.objects.select_related('owner__user'))
         if model_type == 'Stories':
-            return Comment.objects.filter(story=model_instance).order_by('-create_time')
+            return comments.filter(story=model_instance).order_by('-create_time')
         else:
-            return Comment.objects.filter(post=model_instance).order_by('-create_time')
+            return comments.filter(post=model_instance).order_by('-create_time')
 
+    @serialized_write
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
             model_type = self.kwargs['model_type'].capitalize()
@@ -132,47 +338,17 @@ class CommentViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("Ты должен быть авторизован, чтобы оставить комментарий.")
 
-    @action(detail=True, methods=['get', 'post'])
-    def like(self, request, model_type=None, model_pk=None, pk=None, lang=None):
-        comment = self.get_object()
-        content_type = ContentType.objects.get_for_model(comment)
-        user_profile = UserProfile.objects.get(user=request.user)
-        if request.method == 'POST':
-            like, created = Like.objects.get_or_create(owner=user_profile, content_type=content_type,
-                                                       object_id=comment.id)
-            if created:
-                return Response({'status': 'Comment liked.'})
-            else:
-                return Response({'status': 'You already liked this comment.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=comment.id).count()
-            return Response({'likes_count': likes_count})
-
-    @action(detail=True, methods=['get', 'post'])
-    def unlike(self, request, model_type=None, model_pk=None, pk=None, lang=None):
-        comment = self.get_object()
-        content_type = ContentType.objects.get_for_model(comment)
-        user_profile = UserProfile.objects.get(user=request.user)
-        like = Like.objects.filter(owner=user_profile, content_type=content_type, object_id=comment.id)
-        if request.method == 'POST':
-            if like.exists():
-                like.delete()
-                return Response({'status': 'Comment unliked.'})
-            else:
-                return Response({'status': 'You have not liked this comment yet.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=comment.id).count()
-            return Response({'likes_count': likes_count})
-
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(CachedListMixin, LanguageProjectionViewMixin, LikeActionsMixin, viewsets.ModelViewSet):
+    cache_labels = ['news', 'userprofile']
     permission_classes = [IsAdminOrReadOnly, ]
     serializer_class = NewsSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         lang = self.kwargs.get('lang')
-        return News.objects.filter(**{f'title_{lang}__isnull': False, f'body_{lang}__isnull': False}).order_by(
-            '-create_time')
+        queryset = News.objects.filter(**{f'title_{lang}__isnull': False, f'body_{lang}__isnull': False})
+        return self.project(queryset).order_by('-create_time')
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated and self.request.user.is_staff:
@@ -180,46 +356,18 @@ class NewsViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("Ты должен быть авторизован как админ, чтобы создать новость.")
 
-    @action(detail=True, methods=['get', 'post'])
-    def like(self, request, pk=None, lang=None):
-        news = self.get_object()
-        content_type = ContentType.objects.get_for_model(news)
-        user_profile = UserProfile.objects.get(user=request.user)
-        if request.method == 'POST':
-            like, created = Like.objects.get_or_create(owner=user_profile, content_type=content_type, object_id=news.id)
-            if created:
-                return Response({'status': 'News liked.'})
-            else:
-                return Response({'status': 'You already liked this news.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=news.id).count()
-            return Response({'likes_count': likes_count})
-
-    @action(detail=True, methods=['get', 'post'])
-    def unlike(self, request, pk=None, lang=None):
-        news = self.get_object()
-        content_type = ContentType.objects.get_for_model(news)
-        user_profile = UserProfile.objects.get(user=request.user)
-        like = Like.objects.filter(owner=user_profile, content_type=content_type, object_id=news.id)
-        if request.method == 'POST':
-            if like.exists():
-                like.delete()
-                return Response({'status': 'News unliked.'})
-            else:
-                return Response({'status': 'You have not liked this news yet.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=news.id).count()
-            return Response({'likes_count': likes_count})
-
 
-class PostsViewSet(viewsets.ModelViewSet):
+class PostsViewSet(CachedListMixin, LanguageProjectionViewMixin, LikeActionsMixin, viewsets.ModelViewSet):
+    cache_labels = ['posts', 'userprofile']
     permission_classes = [IsOwnerOrReadOnly, ]
     serializer_class = PostsSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         lang = self.kwargs.get('lang')
-        return Posts.objects.filter(**{f'title_{lang}__isnull': False, f'body_{lang}__isnull': False}).order_by(
-            '-create_time')
+        queryset = Posts.objects.filter(**{f'title_{lang}__isnull': False, f'body_{lang}__isnull': False})
+        return self.project(queryset).select_related('owner__user').prefetch_related(
+            comments_prefetch(self.projection_language())).order_by('-create_time')
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -227,45 +375,37 @@ class PostsViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("Ты должен быть авторизован, чтобы создать пост.")
 
-    @action(detail=True, methods=['get', 'post'])
-    def like(self, request, pk=None, lang=None):
-        post = self.get_object()
-        content_type = ContentType.objects.get_for_model(post)
-        user_profile = UserProfile.objects.get(user=request.user)
-        if request.method == 'POST':
-            like, created = Like.objects.get_or_create(owner=user_profile, content_type=content_type, object_id=post.id)
-            if created:
-                return Response({'status': 'Post liked.'})
-            else:
-                return Response({'status': 'You already liked this post.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=post.id).count()
-            return Response({'likes_count': likes_count})
-
-    @action(detail=True, methods=['get', 'post'])
-    def unlike(self, request, pk=None, lang=None):
-        post = self.get_object()
-        content_type = ContentType.objects.get_for_model(post)
-        user_profile = UserProfile.objects.get(user=request.user)
-        like = Like.objects.filter(owner=user_profile, content_type=content_type, object_id=post.id)
-        if request.method == 'POST':
-            if like.exists():
-                like.delete()
-                return Response({'status': 'Post unliked.'})
-            else:
-                return Response({'status': 'You have not liked this post yet.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=post.id).count()
-            return Response({'likes_count': likes_count})
-
 
-class StoriesViewSet(viewsets.ModelViewSet):
+class StoriesViewSet(CachedListMixin, LanguageProjectionViewMixin, LikeActionsMixin, viewsets.ModelViewSet):
+    cache_labels = ['stories', 'userprofile']
     permission_classes = [IsOwnerOrReadOnly, ]
     serializer_class = StoriesSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         lang = self.kwargs.get('lang')
-        return Stories.objects.filter(**{f'title_{lang}__isnull': False}).order_by('-create_time')
+        return self.project(Stories.objects.active().filter(**{f'title_{lang}__isnull': False})).select_related(
+            'owner__user').prefetch_related(comments_prefetch(self.projection_language())).order_by(
+            '-create_time', '-id')
+
+    def cache_expires(self):
+        """The tray changes when its earliest active story expires."""
+        return Stories.objects.active().aggregate(expires=Min('expire_time'))['expires']
+
+    def build_list(self, request, lang=None):
+        """Owners with active stories, most recently updated first, each with their stories newest first."""
+        owners = UserProfile.objects.filter(stories__expire_time__gt=timezone.now(),
+                                            **{f'stories__title_{lang}__isnull': False}).annotate(
+            latest_story=Max('stories__create_time')).select_related('user')
+        paginator = StoryTrayPagination()
+        page = paginator.paginate_queryset(owners, request, view=self)
+        stories = list(self.get_queryset().filter(owner__in=page))
+        trays = {}
+        for story, item in zip(stories, self.get_serializer(stories, many=True).data):
+            trays.setdefault(story.owner_id, []).append(item)
+        for owner in page:
+            owner.tray = trays.get(owner.pk, [])
+        return paginator.get_paginated_response(StoryTraySerializer(page, many=True).data)
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -273,34 +413,79 @@ class StoriesViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("Ты должен быть авторизован, чтобы создать историю.")
 
-    @action(detail=True, methods=['get', 'post'])
-    def like(self, request, pk=None, lang=None):
-        story = self.get_object()
-        content_type = ContentType.objects.get_for_model(story)
-        user_profile = UserProfile.objects.get(user=request.user)
-        if request.method == 'POST':
-            like, created = Like.objects.get_or_create(owner=user_profile, content_type=content_type,
-                                                       object_id=story.id)
-            if created:
-                return Response({'status': 'Story liked.'})
-            else:
-                return Response({'status': 'You already liked this story.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=story.id).count()
-            return Response({'likes_count': likes_count})
-
-    @action(detail=True, methods=['get', 'post'])
-    def unlike(self, request, pk=None, lang=None):
-        story = self.get_object()
-        content_type = ContentType.objects.get_for_model(story)
-        user_profile = UserProfile.objects.get(user=request.user)
-        like = Like.objects.filter(owner=user_profile, content_type=content_type, object_id=story.id)
-        if request.method == 'POST':
-            if like.exists():
-                like.delete()
-                return Response({'status': 'Story unliked.'})
-            else:
-                return Response({'status': 'You have not liked this story yet.'})
-        elif request.method == 'GET':
-            likes_count = Like.objects.filter(content_type=content_type, object_id=story.id).count()
-            return Response({'likes_count': likes_count})
+
+class FeedViewSet(viewsets.GenericViewSet):
+    permission_classes = [permissions.IsAuthenticated, ]
+    serializer_class = TimelineEntrySerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return TimelineEntry.objects.filter(owner=self.request.user.userprofile)
+
+    def list(self, request, lang=None):
+        if 'cursor' not in request.query_params:
+            pull_high_follower_content(request.user.userprofile)
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    """Ranked prefix search over the title/body text of news, posts, stories and comments in ``lang``."""
+
+    serializer_class = SearchResultSerializer
+    search_types = CONTENT_MODELS
+
+    def list(self, request, lang=None):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'message': "Укажите поисковый запрос в параметре q."}, status=status.HTTP_400_BAD_REQUEST)
+        names = [name for name in request.query_params.get('type', '').split(',') if name]
+        if any(name not in self.search_types for name in names):
+            return Response({'message': f"Тип должен быть одним из: {', '.join(self.search_types)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        content_types = [ContentType.objects.get_for_model(self.search_types[name]) for name in names]
+        size = KeysetPagination().get_page_size(request)
+        try:
+            offset = min(max(int(request.query_params.get('offset', 0)), 0), settings.SEARCH_MAX_OFFSET)
+        except ValueError:
+            offset = 0
+        documents = search(query, lang, content_types, limit=size + 1, offset=offset)
+        url = request.build_absolute_uri()
+        next_link = replace_query_param(url, 'offset', offset + size) if len(documents) > size else None
+        previous = None
+        if offset:
+            previous = replace_query_param(url, 'offset', offset - size) if offset > size else remove_query_param(
+                url, 'offset')
+        results = self.get_serializer(documents[:size], many=True).data
+        return Response({'next': next_link, 'previous': previous, 'results': results})
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    permission_classes = [permissions.IsAuthenticated, ]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(owner=self.request.user.userprofile)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user.userprofile)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        session = self.get_object()
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        try:
+            session = append_chunk(session, int(index), request._request, length,
+                                   request.headers.get('X-Chunk-SHA256', ''))
+        except UploadError as error:
+            return Response({'message': str(error), **self.get_serializer(session).data}, status=error.status)
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        try:
+            session = finalize_upload(session)
+        except UploadError as error:
+            return Response({'message': str(error), **self.get_serializer(session).data}, status=error.status)
+        return Response(self.get_serializer(session).data)